@@ -1,8 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+
 # Import our custom tools
 from sound_design import InstrumentFactory
-from mixing import SongPlayer, MultiTrackMixer, save_wav, normalize_to_16bit
+from mixing import SongPlayer, MultiTrackMixer, WaveStreamWriter
 # Import the pre-filled aliases object
-from composition_tools import aliases 
+from composition_tools import aliases, compile_track
 
 # --- Main Execution ---
 
@@ -84,13 +86,23 @@ if __name__ == "__main__":
     
     print("\n--- Generating Tracks for 'All of Me' ---")
     
-    # Generate Melody Track
     player_melody = SongPlayer(TEMPO, piano_melody, time_signature="4/4", sample_rate=SAMPLE_RATE)
-    melody_wave = player_melody.generate_song_waveform(melody_track_data, amplitude=1.0)
-    
-    # Generate Chord Track
     player_chords = SongPlayer(TEMPO, piano_chords, time_signature="4/4", sample_rate=SAMPLE_RATE)
-    chord_wave = player_chords.generate_song_waveform(chord_track_data, amplitude=1.0)
+    
+    # Resolve note names to frequency arrays once, up front
+    melody_track = compile_track(melody_track_data, player_melody.freq_calc)
+    chord_track = compile_track(chord_track_data, player_chords.freq_calc)
+    
+    # The two tracks are independent (separate players and instruments),
+    # so render them concurrently. The Numba oscillator kernels still run
+    # one at a time (instruments/_kernels.py launches them under one lock,
+    # and each already uses every core); what overlaps is the NumPy and
+    # Python work around them: sequencing, envelopes, fades and copies.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        melody_future = executor.submit(player_melody.generate_compiled_waveform, melody_track, amplitude=1.0)
+        chord_future = executor.submit(player_chords.generate_compiled_waveform, chord_track, amplitude=1.0)
+        melody_wave = melody_future.result()
+        chord_wave = chord_future.result()
     
     print("-" * 30)
 
@@ -106,7 +118,7 @@ if __name__ == "__main__":
     final_song_wave = track_mixer.mix_tracks(tracks_to_mix)
     
     # 9. --- Save Final .wav File ---
-    final_song_int = normalize_to_16bit(final_song_wave)
-    save_wav("all_of_me_piano.wav", SAMPLE_RATE, final_song_int)
+    with WaveStreamWriter("all_of_me_piano.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(final_song_wave)
     
     print("\n--- All files generated. ---")
\ No newline at end of file
@@ -1,4 +1,5 @@
 import re
+import numpy as np
 from music_tools import NoteFrequencies
 
 class NoteAliases:
@@ -9,29 +10,29 @@ class NoteAliases:
     Provides case-insensitive .get() method for parsers.
     """
     def __init__(self):
+        # Lower-cased name -> value, kept in sync by add_notes/add_chords
+        # so .get() is a single dict lookup.
+        self._lower_index = {}
+        
         # REST is a universal alias
         self.add_notes(REST=[])
 
     def add_notes(self, **kwargs):
         """Adds single notes as lists. e.g., C4=['C4']"""
-        for name, note_val in kwargs.items():
-            if not isinstance(note_val, list):
-                note_val = [note_val]
-            setattr(self, name, note_val)
+        self.add_chords(**{
+            name: note_val if isinstance(note_val, list) else [note_val]
+            for name, note_val in kwargs.items()
+        })
 
     def add_chords(self, **kwargs):
         """Adds chords (lists of notes). e.g., C_MAJOR=['C4', 'E4', 'G4']"""
-        # This is functionally the same as add_notes
-        for name, chord_val in kwargs.items():
-            setattr(self, name, chord_val)
+        # Bulk update: many aliases can be added in one call
+        vars(self).update(kwargs)
+        self._lower_index.update((name.lower(), chord_val) for name, chord_val in kwargs.items())
             
     def get(self, name):
         """Gets an alias by name, case-insensitive."""
-        # Check attributes
-        for attr in dir(self):
-            if attr.lower() == name.lower():
-                return getattr(self, attr)
-        return None
+        return self._lower_index.get(name.lower())
 
 def _create_prefilled_aliases():
     """
@@ -41,16 +42,15 @@ def _create_prefilled_aliases():
     aliases = NoteAliases()
     
     notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    note_names_for_chords = [] # (note_str, octave, full_note_name)
+    octaves = range(2, 6) # Octaves 2, 3, 4, 5
     
     # --- 1. Add all notes from C2 to B5 ---
-    for octave in range(2, 6): # Octaves 2, 3, 4, 5
-        for note in notes:
-            note_name = f"{note}{octave}"
-            # Sanitize name for attribute (C#4 -> Csharp4)
-            attr_name = note_name.replace('#', 'sharp')
-            aliases.add_notes(**{attr_name: [note_name]})
-            note_names_for_chords.append((note, octave, note_name))
+    # Sanitize names for attributes (C#4 -> Csharp4)
+    aliases.add_notes(**{
+        f"{note.replace('#', 'sharp')}{octave}": [f"{note}{octave}"]
+        for octave in octaves
+        for note in notes
+    })
 
     # --- 2. Add standard chords ---
     # We need a freq calc to build the chord note names
@@ -70,33 +70,35 @@ def _create_prefilled_aliases():
         'AUG': [0, 4, 8],   # augmented
     }
     
-    # Helper to get note name from base semitone + offset
-    def get_note_from_semitone(base_semi, octave, offset):
-        new_semi = (base_semi + offset) % 12
-        new_octave = octave + (base_semi + offset) // 12
-        note_letter = semitone_map[new_semi]
-        return f"{note_letter}{new_octave}"
-
-    for note, octave, root_note_name in note_names_for_chords:
-        base_semitone = freq_calc_temp.note_map.get(note)
-        if base_semitone is None:
-            continue
-            
+    # The shape of a chord - its note letters and how many octaves each
+    # one sits above the root's - doesn't depend on the octave, so work
+    # it out once per (root, recipe).
+    chord_shapes = {}
+    for note in notes:
+        base_semitone = freq_calc_temp.note_map[note]
         for recipe_name, recipe_intervals in chord_recipes.items():
-            chord_notes = [
-                get_note_from_semitone(base_semitone, octave, interval)
+            chord_shapes[note, recipe_name] = [
+                (semitone_map[(base_semitone + interval) % 12], (base_semitone + interval) // 12)
                 for interval in recipe_intervals
             ]
-            
-            # e.g., C4_MAJOR
-            attr_name = f"{root_note_name.replace('#', 'sharp')}_{recipe_name}"
-            aliases.add_chords(**{attr_name: chord_notes})
-            
-            # Add default octave (4) alias, e.g. C_MAJOR
-            if octave == 4:
-                attr_name_default = f"{note.replace('#', 'sharp')}_{recipe_name}"
-                if not hasattr(aliases, attr_name_default):
-                    aliases.add_chords(**{attr_name_default: chord_notes})
+
+    chords = {}
+    for octave in octaves:
+        for note in notes:
+            for recipe_name in chord_recipes:
+                chord_notes = [
+                    f"{note_letter}{octave + octave_offset}"
+                    for note_letter, octave_offset in chord_shapes[note, recipe_name]
+                ]
+                
+                # e.g., C4_MAJOR
+                chords[f"{note.replace('#', 'sharp')}{octave}_{recipe_name}"] = chord_notes
+                
+                # Add default octave (4) alias, e.g. C_MAJOR
+                if octave == 4:
+                    chords.setdefault(f"{note.replace('#', 'sharp')}_{recipe_name}", chord_notes)
+                    
+    aliases.add_chords(**chords)
 
     # --- 3. Add Drum Aliases ---
     aliases.add_chords(
@@ -112,4 +114,32 @@ def _create_prefilled_aliases():
 
 # --- Create the single, pre-filled instance ---
 # This is imported by other modules (e.g., main.py, song_parser.py)
-aliases = _create_prefilled_aliases()
\ No newline at end of file
+aliases = _create_prefilled_aliases()
+
+def compile_track(track_data, freq_calc):
+    """
+    Converts track data [(note_list, num_beats), ...] into a
+    struct-of-arrays form that SongPlayer can schedule in bulk.
+    
+    Note names are resolved to frequencies once, up front.
+    Unknown notes are dropped and an empty note list is a rest.
+    
+    Args:
+        track_data (list): List of (note_list, num_beats) tuples.
+        freq_calc (NoteFrequencies): Used to resolve note names.
+        
+    Returns:
+        tuple: (durations, frequencies) where durations is a float array
+            of num_beats per event and frequencies is a list holding one
+            float array of frequencies per event.
+    """
+    # float64 on purpose: sample counts are int(sample_rate * duration),
+    # and rounding the beats to float32 could shift them by a sample.
+    durations = np.asarray([num_beats for _, num_beats in track_data], dtype=float)
+    
+    frequencies = []
+    for note_list, _ in track_data:
+        freqs = [freq_calc.get_frequency(note_name) for note_name in (note_list or [])]
+        frequencies.append(np.asarray([f for f in freqs if f], dtype=float))
+        
+    return durations, frequencies
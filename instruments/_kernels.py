@@ -0,0 +1,189 @@
+"""
+Optional Numba kernels for the oscillator plugins.
+
+Numba is NOT a hard dependency. If it can't be imported, HAVE_NUMBA is
+False and every instrument falls back to its plain NumPy code path.
+
+All kernels take the time array `t` and ADD their result into `out`,
+so several kernels can be layered into the same buffer (e.g. Bass).
+Phases are computed in float64 regardless of the buffer dtype.
+
+Kernel launches are serialized with a lock: Numba's fallback "workqueue"
+threading layer aborts the process if two Python threads enter parallel
+code at once (e.g. tracks rendered on a ThreadPoolExecutor). Each kernel
+already spreads across all cores, so little is lost.
+
+Numba's thread pool is started on import, i.e. from the importing (normally
+main) thread. With the TBB layer, a pool first started from a worker thread
+leaves the interpreter hanging at exit.
+"""
+import functools
+import math
+import threading
+
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+TWO_PI = 2.0 * math.pi
+
+# One cycle of sin, plus a guard point so interpolation never wraps.
+# Linear interpolation in 4096 steps is accurate to 3e-7 (about 1% of a
+# 16-bit step), several times cheaper than libm sin, and the table
+# (32 KiB) stays in L1.
+SINE_TABLE_SIZE = 4096
+SINE_TABLE = np.sin(TWO_PI * np.arange(SINE_TABLE_SIZE + 1) / SINE_TABLE_SIZE)
+
+_launch_lock = threading.Lock()
+
+def _serialized(kernel):
+    """Wraps a parallel kernel so only one thread launches it at a time."""
+    @functools.wraps(kernel)
+    def launch(*args):
+        with _launch_lock:
+            return kernel(*args)
+    return launch
+
+if HAVE_NUMBA:
+    
+    # Starts the thread pool as a side effect (see module docstring)
+    get_num_threads()
+
+    @njit(cache=True, fastmath=True, inline='always')
+    def sin_turns(cycles):
+        """sin(2*pi*cycles), interpolated from SINE_TABLE."""
+        x = (cycles - math.floor(cycles)) * SINE_TABLE_SIZE
+        i = int(x)
+        frac = x - i
+        i &= SINE_TABLE_SIZE - 1 # (x can round up to exactly one cycle)
+        lo = SINE_TABLE[i]
+        return lo + frac * (SINE_TABLE[i + 1] - lo)
+
+    @_serialized
+    @njit(cache=True, parallel=True, fastmath=True)
+    def piano_kernel(t, freqs, mults, amps, out):
+        """
+        Additive synthesis: out[i] += sum_j sum_k amps[k] * sin(2*pi*freqs[j]*mults[k]*t[i])
+        """
+        for i in prange(t.shape[0]):
+            ti = t[i]
+            s = 0.0
+            for j in range(freqs.shape[0]):
+                for k in range(mults.shape[0]):
+                    s += amps[k] * sin_turns(freqs[j] * mults[k] * ti)
+            out[i] += s
+
+    @_serialized
+    @njit(cache=True, parallel=True, fastmath=True)
+    def square_kernel(t, freqs, amp, out):
+        """
+        Square wave mix, same shape as scipy.signal.square (duty 0.5):
+        +amp for the first half of each cycle, -amp for the second.
+        """
+        for i in prange(t.shape[0]):
+            ti = t[i]
+            s = 0.0
+            for j in range(freqs.shape[0]):
+                cycles = freqs[j] * ti
+                if cycles - math.floor(cycles) < 0.5:
+                    s += amp
+                else:
+                    s -= amp
+            out[i] += s
+
+    @_serialized
+    @njit(cache=True, parallel=True, fastmath=True)
+    def saw_kernel(t, freqs, amp, out):
+        """
+        Rising sawtooth mix, same shape as scipy.signal.sawtooth:
+        ramps from -amp to +amp over each cycle.
+        """
+        for i in prange(t.shape[0]):
+            ti = t[i]
+            s = 0.0
+            for j in range(freqs.shape[0]):
+                cycles = freqs[j] * ti
+                s += amp * (2.0 * (cycles - math.floor(cycles)) - 1.0)
+            out[i] += s
+
+    @_serialized
+    @njit(cache=True, parallel=True, fastmath=True)
+    def int16_kernel(src, dst, limit, scale):
+        """
+        16-bit conversion in one pass: dst[i] = int16(clip(src[i]) * scale),
+        clipped to [-limit, limit] and truncated toward zero. Pass limit
+        (1) and scale (32767) in src's dtype, so the math stays in that
+        precision (same result as np.int16(np.clip(src, -1, 1) * 32767)).
+        """
+        for i in prange(src.shape[0]):
+            dst[i] = np.int16(min(max(src[i], -limit), limit) * scale)
+
+    @_serialized
+    @njit(cache=True, parallel=True)
+    def ads_envelope_kernel(wave, out, attack_samples, decay_samples, sustain_level, gain):
+        """
+        out[i] = wave[i] * gain * env(i), with the Attack-Decay-Sustain
+        envelope computed on the fly rather than stored: a linear 0 -> 1
+        attack, a linear 1 -> sustain_level decay, then sustain_level.
+
+        Same values as BaseInstrument.envelope_array (np.linspace in
+        float64, rounded to float32) scaled by gain, so no fastmath here:
+        reassociating the products would change the rounding.
+        """
+        decay_end = attack_samples + decay_samples
+        sustain = np.float32(sustain_level) * gain
+        attack_step = 1.0 / (attack_samples - 1) if attack_samples > 1 else 0.0
+        decay_step = (sustain_level - 1.0) / (decay_samples - 1) if decay_samples > 1 else 0.0
+        for i in prange(wave.shape[0]):
+            if i < attack_samples:
+                env = np.float32(1.0 if i == attack_samples - 1 and i > 0 else i * attack_step) * gain
+            elif i < decay_end:
+                k = i - attack_samples
+                env = np.float32(sustain_level if k == decay_samples - 1 and k > 0 else k * decay_step + 1.0) * gain
+            else:
+                env = sustain
+            out[i] = wave[i] * env
+
+    # The kernels below work on short buffers (a note's release tail, one
+    # audio callback block), where threads cost more than they save. They
+    # are serial, so they need no launch lock.
+
+    @njit(cache=True, fastmath=True)
+    def fade_out_kernel(wave, num_samples):
+        """
+        Linear fade to silence over the last num_samples samples of wave,
+        in place (same ramp as np.linspace(1, 0, num_samples)).
+        """
+        start = wave.shape[0] - num_samples
+        step = 1.0 / (num_samples - 1) if num_samples > 1 else 0.0
+        for i in range(num_samples):
+            wave[start + i] *= 1.0 - i * step
+
+    @njit(cache=True, fastmath=True)
+    def saw_stereo_kernel(phases, increments, amps, out):
+        """
+        Live synth block: one bank of saw oscillators per output channel.
+        
+        Phases are uint32 accumulators covering one cycle (2**32 steps),
+        so wrapping is free on integer overflow. Read as a signed int32,
+        the phase runs from -2**31 up to 2**31 - 1: that is the saw itself,
+        scaled by 2**31. Each oscillator steps its phase by increments[c, j]
+        per sample, with no floor or compare.
+        
+            out[i, c] = sum_j amps[j] * int32(phase_cj(i)) / 2**31
+        """
+        out[:] = 0.0
+        for c in range(out.shape[1]):
+            for j in range(amps.shape[0]):
+                gain = amps[j] * (1.0 / 2**31)
+                if gain == 0.0:
+                    continue
+                phi = np.uint32(phases[c, j])
+                inc = np.uint32(increments[c, j])
+                for i in range(out.shape[0]):
+                    out[i, c] += gain * np.int32(phi)
+                    phi = np.uint32(phi + inc)
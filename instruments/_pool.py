@@ -0,0 +1,54 @@
+"""
+A small, thread-safe free list of NumPy buffers.
+
+Rendering a song allocates the same few buffer sizes over and over
+(one per note length). Instead of handing them back to the allocator,
+finished buffers can be returned with put() and handed out again by get().
+
+Ownership rule: only put() a buffer you got from get() (or otherwise own
+outright) and never touch it again afterwards.
+"""
+import threading
+from collections import defaultdict
+import numpy as np
+
+# Upper bound on idle buffers kept per (shape, dtype)
+MAX_FREE_PER_SHAPE = 8
+
+_free = defaultdict(list)
+_lock = threading.Lock()
+
+def _key(shape, dtype):
+    if isinstance(shape, int):
+        shape = (shape,)
+    return tuple(shape), np.dtype(dtype)
+
+def get(shape, dtype=np.float32):
+    """Returns an UNINITIALIZED buffer of the given shape and dtype."""
+    key = _key(shape, dtype)
+    with _lock:
+        bufs = _free.get(key)
+        if bufs:
+            return bufs.pop()
+    return np.empty(key[0], dtype=key[1])
+
+def zeros(shape, dtype=np.float32):
+    """Like get(), but zero-filled."""
+    buf = get(shape, dtype)
+    buf.fill(0)
+    return buf
+
+def put(buf):
+    """Returns a buffer to the pool. Views and read-only arrays are ignored."""
+    if buf is None or buf.base is not None or not buf.flags.writeable:
+        return
+    key = _key(buf.shape, buf.dtype)
+    with _lock:
+        bufs = _free[key]
+        if len(bufs) < MAX_FREE_PER_SHAPE:
+            bufs.append(buf)
+
+def clear():
+    """Drops every pooled buffer."""
+    with _lock:
+        _free.clear()
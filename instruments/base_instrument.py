@@ -1,5 +1,51 @@
 import numpy as np
 import abc # Abstract Base Class
+import threading
+from collections import OrderedDict
+from . import _pool
+from . import _kernels
+
+# numexpr is optional: it runs the envelope multiply as one blocked,
+# multi-threaded pass. Without it we fall back to a plain NumPy multiply.
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+def _multiply_into(waveform, env, out=None):
+    """out = waveform * env (all float32, same length); in place by default."""
+    if out is None:
+        out = waveform
+    if ne is not None:
+        ne.evaluate('w * env', local_dict={'w': waveform, 'env': env}, out=out)
+    else:
+        np.multiply(waveform, env, out=out)
+    return out
+
+# LRU cache: (num_samples, sample_rate) -> read-only time array, shared by
+# every instrument. Songs only use a handful of distinct note lengths, but
+# a .song file can ask for any number of them, so the cache is bounded.
+# Tracks may render on several threads at once, hence the lock.
+_T_CACHE = OrderedDict()
+_T_CACHE_SIZE = 64
+_t_cache_lock = threading.Lock()
+
+def _time_array(num_samples, sample_rate):
+    """Returns the (cached, read-only) sample times i / sample_rate."""
+    key = (num_samples, sample_rate)
+    with _t_cache_lock:
+        t = _T_CACHE.get(key)
+        if t is not None:
+            _T_CACHE.move_to_end(key)
+            return t
+        
+    t = np.arange(num_samples) / sample_rate
+    t.setflags(write=False)
+    with _t_cache_lock:
+        _T_CACHE[key] = t
+        if len(_T_CACHE) > _T_CACHE_SIZE:
+            _T_CACHE.popitem(last=False)
+    return t
 
 class BaseInstrument(abc.ABC):
     """
@@ -7,6 +53,11 @@ class BaseInstrument(abc.ABC):
     Defines the required interface for an instrument.
     """
     
+    # Finished waveforms are memoized per instrument instance.
+    # Plugins with non-deterministic output (e.g. noise) should set this to False.
+    cache_waveforms = True
+    wave_cache_size = 256
+    
     def __init__(self, attack_s=0.01, decay_s=0.0, sustain_level=1.0):
         """
         Initializes the instrument with its envelope parameters.
@@ -15,35 +66,41 @@ class BaseInstrument(abc.ABC):
         self.decay_s = decay_s
         self.sustain_level = sustain_level
         
-    def apply_ads_envelope(self, waveform, duration_s, sample_rate):
+        # LRU cache: (frequencies, duration, sample_rate, amplitude, envelope) -> read-only waveform
+        self._wave_cache = OrderedDict()
+        
+    def envelope_array(self, num_samples, sample_rate):
         """
-        Applies an Attack-Decay-Sustain (ADS) envelope to a waveform.
+        Builds the Attack-Decay-Sustain (ADS) envelope as a float32 array.
         (The "Release" is handled by SongPlayer's note fade-out)
         """
-        num_samples = len(waveform)
+        env = np.empty(num_samples, dtype=np.float32)
         if num_samples == 0:
-            return waveform
+            return env
             
+        attack_samples, decay_samples = self._envelope_segments(num_samples, sample_rate)
+        decay_end = attack_samples + decay_samples
+
+        env[:attack_samples] = np.linspace(0, 1, attack_samples, dtype=np.float32)
+        env[attack_samples:decay_end] = np.linspace(1, self.sustain_level, decay_samples, dtype=np.float32)
+        env[decay_end:] = self.sustain_level
+        return env
+
+    def _envelope_segments(self, num_samples, sample_rate):
+        """Returns the (attack, decay) lengths in samples, clipped to num_samples."""
         attack_samples = int(sample_rate * self.attack_s)
         decay_samples = int(sample_rate * self.decay_s)
         
         # Ensure envelope segments don't exceed total duration
         attack_samples = min(attack_samples, num_samples)
         decay_samples = min(decay_samples, num_samples - attack_samples)
-        sustain_samples = num_samples - attack_samples - decay_samples
+        return attack_samples, decay_samples
 
-        if attack_samples > 0:
-            attack_env = np.linspace(0, 1, attack_samples)
-            waveform[:attack_samples] *= attack_env
-        
-        if decay_samples > 0:
-            decay_env = np.linspace(1, self.sustain_level, decay_samples)
-            waveform[attack_samples:attack_samples + decay_samples] *= decay_env
-            
-        if sustain_samples > 0:
-            waveform[attack_samples + decay_samples:] *= self.sustain_level
-            
-        return waveform
+    def apply_ads_envelope(self, waveform, duration_s, sample_rate):
+        """
+        Applies an Attack-Decay-Sustain (ADS) envelope to a waveform in place.
+        """
+        return _multiply_into(waveform, self.envelope_array(len(waveform), sample_rate))
 
     @abc.abstractmethod
     def _generate_wave(self, t, frequencies, sample_rate):
@@ -52,36 +109,94 @@ class BaseInstrument(abc.ABC):
         Generates the raw, un-enveloped waveform.
         
         Args:
-            t (np.array): The time array.
-            frequencies (list): List of frequencies to play.
+            t (np.array): The time array (read-only, shared between calls).
+            frequencies (np.array): 1-D float64 array of the frequencies to
+                play. Render them in one go by broadcasting against t
+                (e.g. freqs[:, None] * t[None, :]) rather than looping.
             sample_rate (int): The sample rate.
             
         Returns:
-            np.array: The raw waveform.
+            np.array: The raw waveform (float32 preferred; other float
+                dtypes are converted).
         """
         pass
 
-    def get_waveform(self, frequencies: list, duration_s: float, sample_rate: int, amplitude: float):
+    def get_waveform(self, frequencies: list, duration_s: float, sample_rate: int, amplitude: float, out=None, cache=True):
         """
         Public method to get the final, enveloped waveform.
-        This method should not be overridden.
+        Plugins normally shouldn't override this (Drums does, to keep its
+        per-hit envelopes and levels).
+        
+        Repeated calls with the same arguments are served from a cache.
+        Callers always get a fresh, writable copy. Pass cache=False to
+        skip the cache when the caller keeps its own copy of the result
+        (e.g. SongPlayer's note cache), so it isn't stored twice.
+        
+        If out (a float32 array of int(sample_rate * duration_s) samples,
+        e.g. a slice of a song buffer) is given, the waveform is written
+        into it and out is returned instead.
+        
+        frequencies can be any sequence of numbers; it's converted to a
+        float64 array once here, which is what _generate_wave receives.
+        (float64, not float32: phases are computed from it.)
         """
+        frequencies = np.asarray(frequencies, dtype=float)
+        cache_key = None
+        if self.cache_waveforms and cache:
+            cache_key = (tuple(sorted(frequencies)), round(duration_s, 6), sample_rate, amplitude,
+                         self.attack_s, self.decay_s, self.sustain_level)
+            cached = self._wave_cache.get(cache_key)
+            if cached is not None:
+                self._wave_cache.move_to_end(cache_key)
+                if out is None:
+                    out = np.empty(cached.shape, cached.dtype)
+                np.copyto(out, cached)
+                return out
+
         num_samples = int(sample_rate * duration_s)
-        t = np.linspace(0., duration_s, num_samples, endpoint=False)
+        # The time base stays float64: a float32 clock loses sub-microsecond
+        # resolution after a few seconds, which is audible as phase jitter
+        # on the upper harmonics. Everything downstream is float32.
+        t = _time_array(num_samples, sample_rate)
         
-        if not frequencies:
-            return np.zeros(num_samples)
+        if len(frequencies) == 0:
+            if out is None:
+                return np.zeros(num_samples, dtype=np.float32)
+            out.fill(0)
+            return out
 
         # 1. Call the plugin's specific generator
         raw_wave = self._generate_wave(t, frequencies, sample_rate)
+        owns_raw_wave = False
+        if raw_wave.dtype != np.float32:
+            raw_wave = raw_wave.astype(np.float32)
+            owns_raw_wave = True
         
-        # 2. Normalize and apply amplitude
+        # 2. Normalize, apply amplitude and the ADS envelope.
+        # The scalar gain is folded into the envelope so the (long)
+        # waveform is only swept once. With Numba the envelope isn't
+        # even stored: it's computed as the waveform is swept.
         max_val = np.max(np.abs(raw_wave))
-        if max_val > 0:
-            raw_wave /= max_val
-        raw_wave *= amplitude
-
-        # 3. Apply the ADS envelope
-        enveloped_wave = self.apply_ads_envelope(raw_wave, duration_s, sample_rate)
+        gain = amplitude / max_val if max_val > 0 else amplitude
+        if _kernels.HAVE_NUMBA:
+            enveloped_wave = raw_wave if out is None else out
+            _kernels.ads_envelope_kernel(raw_wave, enveloped_wave,
+                                         *self._envelope_segments(num_samples, sample_rate),
+                                         float(self.sustain_level), np.float32(gain))
+        else:
+            env = self.envelope_array(num_samples, sample_rate)
+            env *= gain
+            enveloped_wave = _multiply_into(raw_wave, env, out)
+        if out is not None and owns_raw_wave:
+            # Our float32 copy is done with. (Whatever the plugin returned
+            # is its own array, which it may still hold, so never recycle it.)
+            _pool.put(raw_wave)
+        
+        if cache_key is not None:
+            cached = enveloped_wave.copy()
+            cached.setflags(write=False)
+            self._wave_cache[cache_key] = cached
+            if len(self._wave_cache) > self.wave_cache_size:
+                self._wave_cache.popitem(last=False)
         
         return enveloped_wave
\ No newline at end of file
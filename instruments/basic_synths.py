@@ -1,28 +1,96 @@
 import numpy as np
-from scipy import signal
 from .base_instrument import BaseInstrument # Relative import
+from . import _kernels, _pool
+
+_UNIT = np.ones(1)
+
+def _phase_matrix(t, frequencies):
+    """
+    Returns a pooled (num_freqs, num_samples) matrix of 2*pi*f*t phases.
+    Phases stay float64; only the mixed output is float32.
+    Hand it back with _pool.put() once it's no longer needed.
+    """
+    freqs = np.asarray(frequencies, dtype=float)
+    phase = _pool.get((freqs.size, len(t)), np.float64)
+    np.multiply(freqs[:, None], t[None, :], out=phase)
+    phase *= 2 * np.pi
+    return phase
+
+def sawtooth_wave(phase, out):
+    """
+    Rising sawtooth, same shape as scipy.signal.sawtooth: -1 -> +1 over
+    each 2*pi of phase. Written into out (which may be phase itself).
+    """
+    np.multiply(phase, 1 / (2 * np.pi), out=out)
+    np.mod(out, 1.0, out=out)
+    out *= 2
+    out -= 1
+    return out
+
+def square_wave(phase, out):
+    """
+    Square wave, same shape as scipy.signal.square (duty 0.5): +1 for the
+    first half of each cycle, -1 for the second. Written into out.
+    """
+    np.multiply(phase, 1 / (2 * np.pi), out=out)
+    np.mod(out, 1.0, out=out)
+    np.greater_equal(out, 0.5, out=out)
+    out *= -2
+    out += 1
+    return out
+
+def oscillator_sums(t, frequencies, *shapes):
+    """
+    Renders all frequencies through each oscillator shape in one batch,
+    e.g. sin_mix, saw_mix = oscillator_sums(t, freqs, np.sin, sawtooth_wave)
+    
+    Each shape is called once as shape(phase, out=buf) on the whole
+    (num_freqs, num_samples) phase matrix. Returns one float32 mix
+    (summed over frequencies) per shape, drawn from the buffer pool.
+    """
+    phase = _phase_matrix(t, frequencies)
+    # The last shape can overwrite the phases; earlier ones need scratch
+    scratch = _pool.get(phase.shape, np.float64) if len(shapes) > 1 else None
+    
+    mixes = []
+    for i, shape in enumerate(shapes):
+        wave = phase if i == len(shapes) - 1 else scratch
+        shape(phase, out=wave)
+        mixed_wave = _pool.get(len(t))
+        wave.sum(axis=0, out=mixed_wave)
+        mixes.append(mixed_wave)
+        
+    _pool.put(phase)
+    _pool.put(scratch)
+    return mixes
 
 class Sine(BaseInstrument):
     """A simple, pure sine wave oscillator."""
     def _generate_wave(self, t, frequencies, sample_rate):
-        mixed_wave = np.zeros(len(t))
-        for freq in frequencies:
-            mixed_wave += np.sin(2 * np.pi * freq * t)
+        if _kernels.HAVE_NUMBA:
+            mixed_wave = _pool.zeros(len(t))
+            _kernels.piano_kernel(t, np.asarray(frequencies, dtype=float), _UNIT, _UNIT, mixed_wave)
+            return mixed_wave
+        mixed_wave, = oscillator_sums(t, frequencies, np.sin)
         return mixed_wave
 
 class Square(BaseInstrument):
     """A square wave oscillator."""
     def _generate_wave(self, t, frequencies, sample_rate):
-        mixed_wave = np.zeros(len(t))
-        for freq in frequencies:
-            mixed_wave += signal.square(2 * np.pi * freq * t)
+        if _kernels.HAVE_NUMBA:
+            mixed_wave = _pool.zeros(len(t))
+            _kernels.square_kernel(t, np.asarray(frequencies, dtype=float), 1.0, mixed_wave)
+            return mixed_wave
+        mixed_wave, = oscillator_sums(t, frequencies, square_wave)
         return mixed_wave
 
 class Sawtooth(BaseInstrument):
     """A sawtooth wave oscillator."""
     def _generate_wave(self, t, frequencies, sample_rate):
-        mixed_wave = np.zeros(len(t))
-        for freq in frequencies:
-            # Use signal.sawtooth for an upward-ramping saw
-            mixed_wave += signal.sawtooth(2 * np.pi * freq * t)
-        return mixed_wave
\ No newline at end of file
+        if _kernels.HAVE_NUMBA:
+            mixed_wave = _pool.zeros(len(t))
+            _kernels.saw_kernel(t, np.asarray(frequencies, dtype=float), 1.0, mixed_wave)
+            return mixed_wave
+        # Upward-ramping saw
+        mixed_wave, = oscillator_sums(t, frequencies, sawtooth_wave)
+        return mixed_wave
@@ -1,6 +1,10 @@
 import numpy as np
-from scipy import signal # For sawtooth wave
 from .base_instrument import BaseInstrument
+from .basic_synths import oscillator_sums, sawtooth_wave
+from . import _kernels, _pool
+
+_UNIT = np.ones(1)
+_HALF = np.full(1, 0.5)
 
 class Bass(BaseInstrument):
     """
@@ -27,17 +31,21 @@ class Bass(BaseInstrument):
         """
         Generates the raw bass waveform by mixing sine and saw waves.
         """
-        mixed_wave = np.zeros(len(t))
+        if _kernels.HAVE_NUMBA:
+            # Both kernels accumulate into the same buffer: 50% sine + 50% saw
+            freqs = np.asarray(frequencies, dtype=float)
+            mixed_wave = _pool.zeros(len(t))
+            _kernels.piano_kernel(t, freqs, _UNIT, _HALF, mixed_wave)
+            _kernels.saw_kernel(t, freqs, 0.5, mixed_wave)
+            return mixed_wave
+
+        # All notes in one batch: a sawtooth for the 'pluck' and harmonics,
+        # a sine wave for the fundamental 'body'
+        sine_mix, saw_mix = oscillator_sums(t, frequencies, np.sin, sawtooth_wave)
         
-        for freq in frequencies:
-            # Sine wave for the fundamental 'body'
-            sine_wave = np.sin(2 * np.pi * freq * t)
-            
-            # Sawtooth wave for the 'pluck' and harmonics
-            saw_wave = signal.sawtooth(2 * np.pi * freq * t)
-            
-            # Mix them 50/50.
-            # This gives it body but also the brightness of a string.
-            mixed_wave += 0.5 * sine_wave + 0.5 * saw_wave
-            
-        return mixed_wave
\ No newline at end of file
+        # Mix them 50/50.
+        # This gives it body but also the brightness of a string.
+        sine_mix += saw_mix
+        sine_mix *= 0.5
+        _pool.put(saw_mix)
+        return sine_mix
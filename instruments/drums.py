@@ -1,5 +1,6 @@
 import numpy as np
-from .base_instrument import BaseInstrument
+from .base_instrument import BaseInstrument, _time_array
+from . import _pool
 from music_tools import NoteFrequencies
 
 class Drums(BaseInstrument):
@@ -9,6 +10,10 @@ class Drums(BaseInstrument):
     Note frequencies are used to identify *which* drum to play.
     """
     
+    # Individual hits are cached instead (see _get_hit), which also
+    # covers every combination of hits.
+    cache_waveforms = False
+    
     def __init__(self, **adsr_params):
         # We set the base envelope to be "flat" because we
         # will generate our own per-drum envelopes.
@@ -28,10 +33,17 @@ class Drums(BaseInstrument):
             'tom': self.freq_calc.get_frequency('F4'),
             'hat': self.freq_calc.get_frequency('G4')
         }
+        
+        # The same mapping as parallel arrays, for one vectorized lookup
+        self._drum_names = ('kick', 'snare', 'tom', 'hat')
+        self._drum_freqs = np.array([self.note_map[name] for name in self._drum_names])
+        
+        # (drum name, num_samples, sample_rate) -> read-only rendered hit
+        self._hit_cache = {}
 
     def _create_envelope(self, attack_s, decay_s, sustain_level, num_samples, sample_rate):
         """Helper to create a per-note ADS envelope."""
-        env = np.zeros(num_samples)
+        env = np.zeros(num_samples, dtype=np.float32)
         
         attack_samples = int(sample_rate * attack_s)
         decay_samples = int(sample_rate * decay_s)
@@ -41,10 +53,10 @@ class Drums(BaseInstrument):
         sustain_samples = num_samples - attack_samples - decay_samples
 
         if attack_samples > 0:
-            env[:attack_samples] = np.linspace(0, 1, attack_samples)
+            env[:attack_samples] = np.linspace(0, 1, attack_samples, dtype=np.float32)
         
         if decay_samples > 0:
-            env[attack_samples:attack_samples + decay_samples] = np.linspace(1, sustain_level, decay_samples)
+            env[attack_samples:attack_samples + decay_samples] = np.linspace(1, sustain_level, decay_samples, dtype=np.float32)
             
         if sustain_samples > 0:
             env[attack_samples + decay_samples:] = sustain_level
@@ -63,8 +75,9 @@ class Drums(BaseInstrument):
         # A simple sine wave oscillator whose frequency changes over time
         # We calculate the phase by taking the cumulative sum of frequency
         phase = np.cumsum(2 * np.pi * freq_env / sample_rate)
-        wave = np.sin(phase)
-        return wave * env
+        wave = np.sin(phase).astype(np.float32)
+        wave *= env
+        return wave
 
     def _create_snare(self, t, sample_rate):
         """A simple snare: white noise + a sharp sine "pop"."""
@@ -72,12 +85,13 @@ class Drums(BaseInstrument):
         env = self._create_envelope(0.001, 0.1, 0.0, num_samples, sample_rate)
         
         # White noise component
-        noise = np.random.uniform(-0.5, 0.5, num_samples)
+        noise = self._noise_rng('snare', num_samples).uniform(-0.5, 0.5, num_samples).astype(np.float32)
         
         # "Body" component (a short sine pop)
-        body = 0.5 * np.sin(2 * np.pi * 200 * t)
+        noise += 0.5 * np.sin(2 * np.pi * 200 * t)
         
-        return (noise + body) * env
+        noise *= env
+        return noise
 
     def _create_hat(self, t, sample_rate):
         """A simple hi-hat: filtered white noise."""
@@ -85,8 +99,9 @@ class Drums(BaseInstrument):
         env = self._create_envelope(0.001, 0.05, 0.0, num_samples, sample_rate)
         
         # "Bright" noise (cubing it emphasizes peaks)
-        noise = np.random.uniform(-1, 1, num_samples) ** 3
-        return noise * env
+        noise = self._noise_rng('hat', num_samples).uniform(-1, 1, num_samples).astype(np.float32) ** 3
+        noise *= env
+        return noise
 
     def _create_tom(self, t, sample_rate):
         """A simple tom: like a kick but higher pitch."""
@@ -96,24 +111,65 @@ class Drums(BaseInstrument):
         # Pitch envelope (200Hz down to 100Hz)
         freq_env = np.linspace(200, 100, num_samples)
         phase = np.cumsum(2 * np.pi * freq_env / sample_rate)
-        wave = np.sin(phase)
-        return wave * env
+        wave = np.sin(phase).astype(np.float32)
+        wave *= env
+        return wave
+
+    def _noise_rng(self, drum_name, num_samples):
+        """
+        A noise generator seeded by (drum, length), so a hit of a given
+        length always renders the same and can be cached.
+        """
+        return np.random.default_rng([self._drum_names.index(drum_name), num_samples])
+
+    def _get_hit(self, drum_name, t, sample_rate):
+        """Returns the (cached, read-only) waveform of a single drum hit."""
+        key = (drum_name, len(t), sample_rate)
+        hit = self._hit_cache.get(key)
+        if hit is None:
+            hit = getattr(self, f'_create_{drum_name}')(t, sample_rate)
+            hit.setflags(write=False)
+            self._hit_cache[key] = hit
+        return hit
 
     def _generate_wave(self, t, frequencies, sample_rate):
         """
         Mixes drum sounds based on the incoming frequencies.
         """
-        mixed_wave = np.zeros(len(t))
-        
-        for freq in frequencies:
-            # Compare frequencies to see which drum to trigger
-            if np.isclose(freq, self.note_map['kick']):
-                mixed_wave += self._create_kick(t, sample_rate)
-            elif np.isclose(freq, self.note_map['snare']):
-                mixed_wave += self._create_snare(t, sample_rate)
-            elif np.isclose(freq, self.note_map['hat']):
-                mixed_wave += self._create_hat(t, sample_rate)
-            elif np.isclose(freq, self.note_map['tom']):
-                mixed_wave += self._create_tom(t, sample_rate)
+        mixed_wave = _pool.zeros(len(t))
+        
+        # Compare all frequencies against all drums at once:
+        # rows are incoming frequencies, columns are drums.
+        matches = np.isclose(frequencies[:, None], self._drum_freqs[None, :])
+        for row in matches:
+            hit_index = np.flatnonzero(row)
+            if hit_index.size:
+                mixed_wave += self._get_hit(self._drum_names[hit_index[0]], t, sample_rate)
                 
-        return mixed_wave
\ No newline at end of file
+        return mixed_wave
+
+    def get_waveform(self, frequencies: list, duration_s: float, sample_rate: int, amplitude: float, out=None, cache=True):
+        """
+        Drums skip the base class's normalization and ADS envelope.
+        Every hit already carries its own envelope, and normalizing
+        would bring quiet hits (e.g. hats) up to the level of loud ones
+        (e.g. kicks). The mix is just scaled by amplitude.
+        
+        There's no waveform cache to skip (hits are cached instead),
+        so cache is ignored.
+        """
+        frequencies = np.asarray(frequencies, dtype=float)
+        num_samples = int(sample_rate * duration_s)
+        if len(frequencies) == 0:
+            if out is None:
+                return np.zeros(num_samples, dtype=np.float32)
+            out.fill(0)
+            return out
+            
+        mixed_wave = self._generate_wave(_time_array(num_samples, sample_rate), frequencies, sample_rate)
+        if out is None:
+            mixed_wave *= amplitude
+            return mixed_wave
+        np.multiply(mixed_wave, amplitude, out=out)
+        _pool.put(mixed_wave)
+        return out
@@ -1,10 +1,18 @@
 import numpy as np
+from collections import OrderedDict
 from .base_instrument import BaseInstrument
+from . import _kernels, _pool
 
 class Piano(BaseInstrument):
     """
     A simple piano sound using additive synthesis of harmonics.
+    
+    The synthesis is linear, so a chord is just the sum of its notes.
+    Single-note waveforms are cached and chords are assembled from them.
     """
+    
+    note_cache_size = 256
+    
     def __init__(self, **adsr_params):
         # Piano has a fast attack and quick decay to zero
         adsr_params.setdefault('attack_s', 0.002)
@@ -20,12 +28,53 @@ class Piano(BaseInstrument):
             (4.0, 0.1),   # 4th harmonic
             (5.0, 0.05),  # 5th harmonic
         ]
+        self._mults = np.array([m for m, _ in self.harmonics])
+        self._amps = np.array([a for _, a in self.harmonics])
+        
+        # LRU cache: (num_samples, sample_rate, frequency) -> read-only raw note.
+        # t is always i / sample_rate (see base_instrument._time_array),
+        # so its length and the sample rate identify it.
+        self._note_cache = OrderedDict()
 
     def _generate_wave(self, t, frequencies, sample_rate):
-        mixed_wave = np.zeros(len(t))
-        
+        mixed_wave = _pool.zeros(len(t))
         for freq in frequencies:
-            for harmonic_mult, amp_mult in self.harmonics:
-                mixed_wave += amp_mult * np.sin(2 * np.pi * (freq * harmonic_mult) * t)
+            mixed_wave += self._generate_single(t, freq, sample_rate)
+        return mixed_wave
+
+    def _generate_single(self, t, freq, sample_rate):
+        """Returns the (cached, read-only) raw waveform of one note."""
+        key = (len(t), sample_rate, float(freq))
+        note = self._note_cache.get(key)
+        if note is not None:
+            self._note_cache.move_to_end(key)
+            return note
+            
+        note = self._render(t, [freq])
+        note.setflags(write=False)
+        self._note_cache[key] = note
+        if len(self._note_cache) > self.note_cache_size:
+            self._note_cache.popitem(last=False)
+        return note
+
+    def _render(self, t, frequencies):
+        """Synthesizes the harmonic stack for the given frequencies."""
+        if _kernels.HAVE_NUMBA:
+            mixed_wave = np.zeros(len(t), dtype=np.float32)
+            _kernels.piano_kernel(t, np.asarray(frequencies, dtype=float), self._mults, self._amps, mixed_wave)
+            return mixed_wave
+
+        # Every (note, harmonic) pair becomes one row of a (K, N) phase
+        # matrix, so the whole chord is a single sin call plus a weighted
+        # row sum (K = notes * harmonics).
+        freqs = np.asarray(frequencies, dtype=float)[:, None] * self._mults[None, :]
+        amps = np.broadcast_to(self._amps, freqs.shape).ravel()
+        phase = _pool.get((freqs.size, len(t)), np.float64)
+        np.multiply(freqs.reshape(-1, 1), t[None, :], out=phase)
+        phase *= 2 * np.pi
+        np.sin(phase, out=phase)
         
+        mixed_wave = np.empty(len(t), dtype=np.float32)
+        np.matmul(amps, phase, out=mixed_wave)
+        _pool.put(phase)
         return mixed_wave
\ No newline at end of file
@@ -2,6 +2,8 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import sounddevice as sd
+import threading
+from collections import deque
 
 # --- Import from your existing synth framework ---
 # We assume these files are in the same directory
@@ -19,12 +21,20 @@ except ImportError:
 SAMPLE_RATE = 44100
 NOTE_DURATION_S = 0.3  # How long each note plays
 MASTER_AMPLITUDE = 0.7
+BLOCK_SIZE = 256       # Audio callback block size (~6ms at 44.1kHz)
+RELEASE_S = 0.01       # Fade-out when a key is released
 
 # Note Mapping (C-Major Scale)
 # We will divide the screen into this many "keys"
 NOTES_TO_PLAY = ['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4', 'C5']
 NUM_KEYS = len(NOTES_TO_PLAY)
 
+# Video Settings
+CAPTURE_WIDTH, CAPTURE_HEIGHT = 640, 480
+# Hand tracking runs on a downscaled copy of each frame. Landmarks come
+# back normalized (0.0 - 1.0), so they map onto the full frame unchanged.
+DETECTION_SIZE = (320, 240)
+
 # --- 2. Initialize Synthesizer ---
 print("Loading synthesizer...")
 try:
@@ -32,18 +42,87 @@ try:
     # We use the 'piano' instrument, as requested
     piano = factory.create_instrument('piano') 
     freq_calc = NoteFrequencies()
+    
+    # Every key plays the same fixed-length note, so render them all
+    # once up front. The video loop then never has to synthesize.
+    NOTE_BANK = [
+        piano.get_waveform(
+            frequencies=[freq_calc.get_frequency(note_name)],
+            duration_s=NOTE_DURATION_S,
+            sample_rate=SAMPLE_RATE,
+            amplitude=MASTER_AMPLITUDE
+        )
+        for note_name in NOTES_TO_PLAY
+    ]
     print("Synthesizer loaded.")
 except Exception as e:
     print(f"Error loading synthesizer: {e}")
     print("Make sure your 'piano' instrument plugin exists in the 'instruments/' folder.")
     exit()
 
-# --- 3. Initialize Video and Hand Tracking ---
+# --- 3. Start Audio Output ---
+# One output stream stays open for the whole session. The video loop only
+# queues voices; the audio callback mixes them into each output block.
+
+class Voice:
+    """A note being played: a pre-rendered waveform and a read position."""
+    def __init__(self, waveform):
+        self.waveform = waveform
+        self.pos = 0
+        self.release_pos = -1  # >= 0 once the key has been released
+
+    def release(self):
+        if self.release_pos < 0:
+            self.release_pos = 0
+
+RELEASE_RAMP = np.linspace(1.0, 0.0, int(SAMPLE_RATE * RELEASE_S), dtype=np.float32)
+
+# Voices currently sounding. The video loop appends and releases them, the
+# callback rotates through them (popleft, mix, append back). A voice is out
+# of the deque for part of each rotation, so both sides hold voices_lock:
+# otherwise a release could miss the voice being mixed. The video loop only
+# holds it for a few appends/flag sets, so the callback never waits long.
+active_voices = deque()
+voices_lock = threading.Lock()
+
+def audio_callback(outdata, frames, time_info, status):
+    out = outdata[:, 0]
+    out.fill(0)
+    with voices_lock:
+        _mix_voices(out, frames)
+
+def _mix_voices(out, frames):
+    """Mixes the next block of every active voice into out (voices_lock held)."""
+    for _ in range(len(active_voices)):
+        voice = active_voices.popleft()
+        chunk = voice.waveform[voice.pos:voice.pos + frames]
+        voice.pos += len(chunk)
+        
+        if voice.release_pos >= 0:
+            # Fade out instead of cutting off (which would click)
+            ramp = RELEASE_RAMP[voice.release_pos:voice.release_pos + len(chunk)]
+            out[:len(ramp)] += chunk[:len(ramp)] * ramp
+            voice.release_pos += len(ramp)
+            finished = voice.release_pos >= len(RELEASE_RAMP)
+        else:
+            out[:len(chunk)] += chunk
+            finished = False
+            
+        if not finished and voice.pos < len(voice.waveform):
+            active_voices.append(voice)
+
+stream = sd.OutputStream(samplerate=SAMPLE_RATE, channels=1, dtype='float32',
+                         blocksize=BLOCK_SIZE, callback=audio_callback)
+stream.start()
+
+# --- 4. Initialize Video and Hand Tracking ---
 print("Starting video capture...")
 cap = cv2.VideoCapture(0)  # 0 is the default webcam
 if not cap.isOpened():
     print("Error: Cannot open webcam.")
     exit()
+cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
+cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
 
 # MediaPipe Hands setup
 mp_hands = mp.solutions.hands
@@ -54,12 +133,16 @@ hands = mp_hands.Hands(
 )
 mp_draw = mp.solutions.drawing_utils
 
-# --- 4. Main Loop ---
+# --- 5. Main Loop ---
 
 # State variables
 last_key_index = -1  # -1 means no key is pressed
 current_key_index = -1
 
+# Per-frame work buffers: allocated on the first frame, then reused
+overlay = None
+small_frame = None
+
 print("Starting live piano. Press 'q' to quit.")
 
 while True:
@@ -76,11 +159,18 @@ while True:
     h, w, _ = frame.shape
     
     # Create a semi-transparent overlay to draw keys on
-    overlay = frame.copy()
+    if overlay is None or overlay.shape != frame.shape:
+        overlay = np.empty_like(frame)
+    np.copyto(overlay, frame)
 
     # --- B. Process Hand ---
-    # Convert to RGB for MediaPipe
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    # Downscale, then hand MediaPipe an RGB *view* (BGR channels reversed).
+    # No separate conversion pass; MediaPipe packs the strided input itself.
+    small_frame = cv2.resize(frame, DETECTION_SIZE, dst=small_frame, interpolation=cv2.INTER_AREA)
+    rgb_frame = small_frame[:, :, ::-1]
+    # Read-only input lets MediaPipe skip its defensive copy.
+    # (Only the view is locked; small_frame stays writable for the next resize.)
+    rgb_frame.flags.writeable = False
     results = hands.process(rgb_frame)
 
     current_key_index = -1  # Reset on each frame
@@ -110,31 +200,24 @@ while True:
     # --- D. Play Audio ---
     if current_key_index != last_key_index:
         # State has changed!
-        sd.stop()  # Stop any note that was playing
-        
+        new_voice = None
         if current_key_index != -1:
             # A new key is pressed
             try:
                 note_name = NOTES_TO_PLAY[current_key_index]
                 print(f"Key: {current_key_index}  Note: {note_name}")
-
-                # Get the frequency for the note
-                freq = freq_calc.get_frequency(note_name)
-                
-                if freq:
-                    # Use your instrument to get the waveform
-                    waveform = piano.get_waveform(
-                        frequencies=[freq],
-                        duration_s=NOTE_DURATION_S,
-                        sample_rate=SAMPLE_RATE,
-                        amplitude=MASTER_AMPLITUDE
-                    )
-                    
-                    # Play the waveform
-                    sd.play(waveform, SAMPLE_RATE)
+                new_voice = Voice(NOTE_BANK[current_key_index])
 
             except Exception as e:
                 print(f"Error playing sound: {e}")
+        
+        with voices_lock:
+            # Release any note that was playing
+            for voice in active_voices:
+                voice.release()
+            # Queue the pre-rendered waveform on the open stream
+            if new_voice is not None:
+                active_voices.append(new_voice)
                 
         last_key_index = current_key_index # Update the state
 
@@ -150,15 +233,11 @@ while True:
 
         # Draw the key divider
         cv2.rectangle(frame, (x1, 0), (x2, h), (255, 255, 255), 1)
-        
-        # Draw the note name
-        cv2.putText(frame, NOTES_TO_PLAY[i], (x1 + 10, h - 20), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
     
     # Blend the overlay with the frame
     frame = cv2.addWeighted(overlay, 0.3, frame, 0.7, 0)
     
-    # Re-draw text on top of the blended image
+    # Draw the note names on top of the blended image
     for i in range(NUM_KEYS):
         x1 = i * key_width
         cv2.putText(frame, NOTES_TO_PLAY[i], (x1 + 10, h - 20), 
@@ -170,8 +249,9 @@ while True:
     if cv2.waitKey(5) & 0xFF == ord('q'):
         break
 
-# --- 5. Cleanup ---
+# --- 6. Cleanup ---
 print("Shutting down...")
 cap.release()
 cv2.destroyAllWindows()
-sd.stop()
\ No newline at end of file
+stream.stop()
+stream.close()
\ No newline at end of file
@@ -2,7 +2,10 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import sounddevice as sd
+import queue
 import threading
+import time
+from instruments import _kernels # Optional Numba kernels (NumPy fallback)
 
 # --- 1. Global Audio Settings ---
 SAMPLE_RATE = 44100
@@ -11,80 +14,188 @@ MAX_FREQ = 880  # A5
 MAX_HANDS = 2   # Max number of hands to track and mix
 MAX_AMP_PER_HAND = 0.4 # Max amplitude for one hand (to prevent clipping)
 DETUNE_HZ = 5   # --- NEW: How much to detune the right channel for binaural effect ---
+BLOCK_SIZE = 128 # Audio block size (~3ms at 44.1kHz)
+RING_BLOCKS = 4  # Blocks rendered ahead of the callback (~12ms)
+# Frequency is mapped on a log scale, rounded to the nearest integer Hz,
+# via a lookup table indexed by the finger's x position (see main loop).
+# 2048 entries keeps neighbours < 1 Hz apart, so every integer frequency
+# in the range is still reachable.
+FREQ_LUT_SIZE = 2048
+FREQ_LUT = np.round(np.geomspace(MIN_FREQ, MAX_FREQ, FREQ_LUT_SIZE)).astype(int).tolist()
+
+# Video Settings
+CAPTURE_WIDTH, CAPTURE_HEIGHT = 640, 480
+# Hand tracking runs on a downscaled copy of each frame. Landmarks come
+# back normalized (0.0 - 1.0), so they map onto the full frame unchanged.
+DETECTION_SIZE = (320, 240)
+# Hand labels are drawn straight onto each frame. Hershey fonts are
+# stroked vector fonts: a label costs ~20us to draw, less than blitting
+# a cached, pre-rendered label image through a mask.
+LABEL_FONT, LABEL_SCALE, LABEL_THICKNESS = cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2
 
 # --- 2. Shared State (for communication between threads) ---
-data_lock = threading.Lock()
-# We now have a list of oscillators, one for each potential hand
-g_oscillators = [
-    {'freq': MIN_FREQ, 'amp': 0.0, 'phase': 0.0} for _ in range(MAX_HANDS)
-]
-
-# --- 3. Audio Callback Function ---
-# This function is called by the sounddevice library in a separate thread
-# whenever it needs more audio samples.
-def audio_callback(outdata, frames, time, status):
-    """Fills the output buffer (outdata) with audio samples."""
-    global g_oscillators, data_lock
+# One oscillator per potential hand, stored as parallel arrays so the
+# audio callback can render all of them at once.
+# Oscillator parameters are double-buffered: each buffer holds a row of
+# freqs and a row of amps. The video thread fills the back buffer, then
+# publishes it by flipping g_front (a single int store, atomic under the
+# GIL). The audio callback only ever reads g_params[g_front], so it never
+# waits on a lock...
+FREQS, AMPS = 0, 1
+g_params = [np.array([[MIN_FREQ] * MAX_HANDS, [0.0] * MAX_HANDS], dtype=np.float32) for _ in range(2)]
+g_front = 0
+# ...and phases are only ever touched by the audio callback.
+# Each is a uint32 phase accumulator, per channel (row 0 = left, row 1 =
+# detuned right) and per oscillator: one cycle is 2**32 steps, so it wraps
+# for free on overflow, and read as an int32 it *is* the saw (scaled by
+# 2**31). Integer steps never lose precision, however long it runs, and
+# the phase stays continuous when a hand moves and the frequency changes.
+g_phases = np.zeros((2, MAX_HANDS), dtype=np.uint32)
+PHASE_STEPS = 2.0**32 / SAMPLE_RATE # Phase steps per sample, per Hz
+SAW_SCALE = np.float32(1.0 / 2**31) # int32 phase -> saw in [-1, 1)
+
+# --- 3. Audio Rendering and Callback ---
+# Oscillator blocks are rendered ahead of time by a worker thread into a
+# small ring buffer. The sounddevice callback, which runs on the real-time
+# audio thread, only copies the next finished block out, so it spends as
+# little time as possible in Python (holding the GIL) and small blocks
+# don't underrun.
+
+# Per block size: sample offsets 0..frames-1 and (frames, MAX_HANDS)
+# integer and float scratch buffers for the NumPy path, allocated once
+# and reused
+_block_buffers = {}
+
+def _block_buffers_for(frames):
+    buffers = _block_buffers.get(frames)
+    if buffers is None:
+        offsets = np.arange(frames, dtype=np.uint32)[:, None]
+        phi = np.empty((frames, MAX_HANDS), dtype=np.uint32)
+        saw = np.empty((frames, MAX_HANDS), dtype=np.float32)
+        buffers = _block_buffers[frames] = (offsets, phi, saw)
+    return buffers
+
+def render_block(outdata, frames):
+    """Renders the next block of audio samples into outdata."""
+    global g_phases
     
-    # --- MODIFIED: Create a 2-channel (stereo) buffer ---
-    final_wave = np.zeros((frames, 2))
+    # Snapshot the currently published oscillator parameters
+    freqs, amps = g_params[g_front].copy()
+
+    # Only active hands are heard; the rest are masked to zero
+    active = amps > 0.001
+    amps = np.where(active, amps, np.float32(0))
+
+    # Left channel plays the main frequency, the right one is detuned
+    # (binaural effect). Phase advance per sample, in uint32 steps:
+    increments = (np.stack((freqs, freqs + DETUNE_HZ)) * PHASE_STEPS).astype(np.uint32)
     
-    # Get a thread-safe copy of the oscillator states
-    # We do this to minimize how long we hold the lock
-    current_oscillators = []
-    with data_lock:
-        for osc in g_oscillators:
-            current_oscillators.append(osc.copy())
-
-    # Generate wave for each oscillator and mix
-    for i in range(MAX_HANDS):
-        freq = current_oscillators[i]['freq']
-        amp = current_oscillators[i]['amp']
-        phase = current_oscillators[i]['phase']
-
-        if amp > 0.001: # Only process if the hand is active
-            # Create an array of time points for this buffer
-            t = (phase + np.arange(frames)) / SAMPLE_RATE
-            
-            # --- MODIFIED: Generate Left and Right channels ---
-            
-            # 1. Left Channel (Main Frequency)
-            wave_left = amp * (2 * (t * freq - np.floor(0.5 + t * freq)))
-            
-            # 2. Right Channel (Detuned Frequency)
-            freq_right = freq + DETUNE_HZ
-            wave_right = amp * (2 * (t * freq_right - np.floor(0.5 + t * freq_right)))
-            
-            # Add it to the final mix (L/R)
-            final_wave[:, 0] += wave_left
-            final_wave[:, 1] += wave_right
-            # --- END MODIFICATION ---
-            
-            # Update the global phase for this oscillator
-            # This is critical for continuous, click-free sound
-            new_phase = (phase + frames) % SAMPLE_RATE
-            with data_lock:
-                g_oscillators[i]['phase'] = new_phase
+    if _kernels.HAVE_NUMBA:
+        # One compiled loop, straight into outdata, no temporaries
+        _kernels.saw_stereo_kernel(g_phases, increments, amps, outdata)
+    else:
+        # Every oscillator's phase is computed at once (one column each)
+        # with wrapping uint32 math, read back as int32 saws, and mixed
+        # down with an amplitude-weighted sum (the 2**31 scale folded in).
+        offsets, phi, saw = _block_buffers_for(frames)
+        for channel in range(2):
+            np.multiply(offsets, increments[channel], out=phi)
+            phi += g_phases[channel]
+            np.copyto(saw, phi.view(np.int32))
+            np.matmul(saw, amps * SAW_SCALE, out=outdata[:, channel])
+
+    # Advance the phase of every active oscillator and reset the others.
+    # This is critical for continuous, click-free sound
+    advanced = g_phases + np.uint32(frames) * increments
+    g_phases = np.where(active, advanced, np.uint32(0))
+
+# Ring of pre-rendered blocks. Block n lives in g_ring[n % RING_BLOCKS].
+# The renderer only advances g_written and the callback only advances
+# g_played (single int stores, atomic under the GIL), so no lock is
+# needed: blocks g_played .. g_written - 1 are ready to play.
+g_ring = np.zeros((RING_BLOCKS, BLOCK_SIZE, 2), dtype=np.float32)
+g_written = 0
+g_played = 0
+
+def render_loop(stop):
+    """Audio worker thread: keeps the ring buffer topped up."""
+    global g_written
+    while not stop.is_set():
+        if g_written - g_played < RING_BLOCKS:
+            render_block(g_ring[g_written % RING_BLOCKS], BLOCK_SIZE)
+            g_written += 1
         else:
-            # If amplitude is 0, reset phase
-            with data_lock:
-                 g_oscillators[i]['phase'] = 0.0
+            # Ring is full, check back in about half a block
+            time.sleep(BLOCK_SIZE / SAMPLE_RATE / 2)
 
-    # --- MODIFIED: Reshape for 2-channel output ---
-    outdata[:] = final_wave
+def audio_callback(outdata, frames, time_info, status):
+    """Called by sounddevice for each output block: plays the next ready block."""
+    global g_played
+    if g_played < g_written:
+        outdata[:] = g_ring[g_played % RING_BLOCKS]
+        g_played += 1
+    else:
+        # Underrun: the renderer fell behind, so play silence
+        outdata.fill(0)
 
 
-# --- 4. Main Program (Video Tracking) ---
-def main():
-    global g_oscillators, data_lock
+# --- 4. Video Pipeline Threads ---
+# Capture -> hand tracking -> (main thread) audio params + display run as
+# three stages, connected by size-1 queues that always hold the newest
+# item: a slow stage skips stale frames instead of falling behind.
+# Frames stay in host memory throughout. MediaPipe and mp_draw both need
+# NumPy images, so offloading the flip and resize (~0.1ms each at 640x480,
+# already off the main thread) to OpenCL via cv2.UMat would only add two
+# GPU round trips per frame.
 
+def _put_latest(q, item):
+    """Puts item on a size-1 queue, replacing whatever is still waiting there."""
+    try:
+        q.get_nowait()
+    except queue.Empty:
+        pass
+    q.put_nowait(item) # Each queue has a single producer, so this can't be full
+
+def capture_loop(cap, frames_out, stop):
+    """Thread A: reads (mirrored) camera frames."""
+    while not stop.is_set():
+        success, frame = cap.read()
+        if not success:
+            continue
+        # Flip the frame horizontally (for a mirror-like view)
+        _put_latest(frames_out, cv2.flip(frame, 1))
+
+def tracking_loop(hands, frames_in, results_out, stop):
+    """Thread B: runs MediaPipe hand tracking on each frame."""
+    small_frame = None # Downscaled detection frame, reused every iteration
+    while not stop.is_set():
+        try:
+            frame = frames_in.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        # Downscale, then hand MediaPipe an RGB *view* (BGR channels reversed).
+        small_frame = cv2.resize(frame, DETECTION_SIZE, dst=small_frame, interpolation=cv2.INTER_AREA)
+        rgb_frame = small_frame[:, :, ::-1]
+        # Read-only input lets MediaPipe skip its defensive copy
+        rgb_frame.flags.writeable = False
+        _put_latest(results_out, (frame, hands.process(rgb_frame)))
+
+
+# --- 5. Main Program (Video Tracking) ---
+def main():
+    global g_front
+    
     # --- Initialize Video and Hand Tracking ---
     print("Starting video capture...")
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("Error: Cannot open webcam.")
         return
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
 
+    # Video mode (static_image_mode=False, the default) keeps tracking the
+    # hands from frame to frame; palm detection only reruns when it loses them.
     mp_hands = mp.solutions.hands
     hands = mp_hands.Hands(
         max_num_hands=MAX_HANDS, # Update to track multiple hands
@@ -94,34 +205,55 @@ def main():
     mp_draw = mp.solutions.drawing_utils
 
     # --- Initialize and Start Audio Stream ---
+    # Compile (or load from cache) the oscillator kernel now, so the
+    # renderer doesn't stall on it. All amps are 0, so this is silent.
+    render_block(np.zeros((BLOCK_SIZE, 2), dtype=np.float32), BLOCK_SIZE)
+    
+    # The renderer starts first, so the ring is already full when the
+    # stream asks for its first block
+    stop = threading.Event()
+    renderer = threading.Thread(target=render_loop, args=(stop,), daemon=True)
+    renderer.start()
+    
     try:
         stream = sd.OutputStream(
             samplerate=SAMPLE_RATE,
             # --- MODIFIED: Set channels to 2 for stereo ---
             channels=2,
+            dtype='float32', # Matches the callback's float32 math
+            blocksize=BLOCK_SIZE, # Fixed, so every block fits a ring slot
+            latency='low',
             callback=audio_callback
         )
         stream.start()
     except Exception as e:
         print(f"Error starting audio stream: {e}")
+        stop.set()
+        renderer.join()
         cap.release()
         return
 
+    # --- Start the Capture and Tracking Threads ---
+    frames = queue.Queue(maxsize=1)
+    tracked = queue.Queue(maxsize=1)
+    workers = [
+        threading.Thread(target=capture_loop, args=(cap, frames, stop), daemon=True),
+        threading.Thread(target=tracking_loop, args=(hands, frames, tracked, stop), daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
     print("Starting Theremin. Press 'q' to quit.")
 
     while True:
-        # --- Get Video Frame ---
-        success, frame = cap.read()
-        if not success:
+        # --- Get the Latest Tracked Frame ---
+        try:
+            frame, results = tracked.get(timeout=0.1)
+        except queue.Empty:
             continue
         
-        frame = cv2.flip(frame, 1)
         h, w, _ = frame.shape
 
-        # --- Process Hands ---
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = hands.process(rgb_frame)
-
         # A list to hold states for hands found in this frame
         current_hand_states = [] 
 
@@ -137,17 +269,12 @@ def main():
                 norm_y = index_tip.y
                 
                 # --- Map Position to Audio Parameters ---
-                # X-axis (Left/Right) controls Frequency
-                log_min = np.log(MIN_FREQ)
-                log_max = np.log(MAX_FREQ)
-                log_freq = log_min + (log_max - log_min) * norm_x
-                
-                # Round to the nearest integer frequency
-                current_freq = round(np.exp(log_freq))
+                # X-axis (Left/Right) controls Frequency (clamped to the range)
+                lut_index = min(max(int(norm_x * (FREQ_LUT_SIZE - 1) + 0.5), 0), FREQ_LUT_SIZE - 1)
+                current_freq = FREQ_LUT[lut_index]
 
-                # Y-axis (Up/Down) controls Amplitude
-                current_amp = (1.0 - norm_y) * MAX_AMP_PER_HAND
-                current_amp = max(0.0, current_amp) # Ensure it's not negative
+                # Y-axis (Up/Down) controls Amplitude (never negative)
+                current_amp = max(0.0, (1.0 - norm_y) * MAX_AMP_PER_HAND)
                 
                 # Add this hand's state to our list
                 current_hand_states.append({'freq': current_freq, 'amp': current_amp})
@@ -159,27 +286,31 @@ def main():
                 cv2.circle(frame, (finger_x, finger_y), 10, (0, 255, 0), cv2.FILLED)
 
         # --- Update Shared Audio State ---
-        with data_lock:
-            for i in range(MAX_HANDS):
-                if i < len(current_hand_states):
-                    # A hand is active, update its oscillator
-                    g_oscillators[i]['freq'] = current_hand_states[i]['freq']
-                    g_oscillators[i]['amp'] = current_hand_states[i]['amp']
-                else:
-                    # No hand for this oscillator, set amplitude to 0
-                    g_oscillators[i]['amp'] = 0.0
+        # Fill the back buffer (starting from the current state), then
+        # publish it in one atomic flip
+        back = g_params[1 - g_front]
+        back[:] = g_params[g_front]
+        for i in range(MAX_HANDS):
+            if i < len(current_hand_states):
+                # A hand is active, update its oscillator
+                back[FREQS, i] = current_hand_states[i]['freq']
+                back[AMPS, i] = current_hand_states[i]['amp']
+            else:
+                # No hand for this oscillator, set amplitude to 0
+                back[AMPS, i] = 0.0
+        g_front = 1 - g_front
 
         # --- Display Info on Frame ---
         # We read back from the global state for a consistent display
-        with data_lock:
-            osc_display_list = [osc.copy() for osc in g_oscillators]
+        # (Only this thread writes the parameters, so no copy is needed)
+        display_freqs, display_amps = g_params[g_front]
 
-        for i, osc in enumerate(osc_display_list):
-            if osc['amp'] > 0.01: # Only show active hands
+        for i in range(MAX_HANDS):
+            if display_amps[i] > 0.01: # Only show active hands
                 # Display the frequency. Since it's rounded, .00 will be shown.
-                text = f"Hand {i}: {osc['freq']:.2f} Hz, {osc['amp']:.2f} Vol"
+                text = f"Hand {i}: {display_freqs[i]:.2f} Hz, {display_amps[i]:.2f} Vol"
                 cv2.putText(frame, text, (10, h - 10 - (i * 30)), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                            LABEL_FONT, LABEL_SCALE, (255, 255, 255), LABEL_THICKNESS)
         
         # --- Display and Exit ---
         cv2.imshow("Live Theremin - (Press 'q' to quit)", frame)
@@ -189,6 +320,10 @@ def main():
 
     # --- Cleanup ---
     print("Shutting down...")
+    stop.set()
+    for worker in workers:
+        worker.join()
+    renderer.join()
     stream.stop()
     stream.close()
     cap.release()
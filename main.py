@@ -1,6 +1,6 @@
 # Import our custom tools
 from sound_design import InstrumentFactory
-from mixing import SongPlayer, MultiTrackMixer, save_wav, normalize_to_16bit
+from mixing import SongPlayer, MultiTrackMixer, WaveStreamWriter
 
 # --- Main Execution (Example Usage) ---
 
@@ -75,23 +75,22 @@ if __name__ == "__main__":
     melody_wave = player.generate_song_waveform(twinkle_twinkle_melody, amplitude=1.0)
     
     # 7. Normalize and save (optional, good for debugging)
-    melody_wave_int = normalize_to_16bit(melody_wave)
-    save_wav("song_melody_piano.wav", SAMPLE_RATE, melody_wave_int)
+    with WaveStreamWriter("song_melody_piano.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(melody_wave)
 
     # 8. Generate the chord progression with the synth sound
     print("\n--- Generating Chords (Sawtooth Synth) ---")
     
     # Change the player's instrument and tempo
     player.instrument = synth_sound
-    player.tempo = 80 # Slow down the tempo for the chords
-    player.beat_duration_s = 60.0 / player.tempo # Update beat duration
+    player.reconfigure(tempo=80) # Slow down the tempo for the chords
     
     # Generate at full amplitude; we will set volume in the mixer
     chord_wave = player.generate_song_waveform(chord_progression, amplitude=1.0)
     
     # 9. Normalize and save (optional, good for debugging)
-    chord_wave_int = normalize_to_16bit(chord_wave)
-    save_wav("song_chords_synth.wav", SAMPLE_RATE, chord_wave_int)
+    with WaveStreamWriter("song_chords_synth.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(chord_wave)
     
     # 10. --- Mix the two tracks together ---
     print("\n--- Mixing Tracks ---")
@@ -107,7 +106,7 @@ if __name__ == "__main__":
     final_song_wave = track_mixer.mix_tracks(tracks_to_mix)
     
     # 11. Normalize and save the final song
-    final_song_int = normalize_to_16bit(final_song_wave)
-    save_wav("song_final_mix.wav", SAMPLE_RATE, final_song_int)
+    with WaveStreamWriter("song_final_mix.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(final_song_wave)
     
     print("\n--- All files generated. ---")
\ No newline at end of file
@@ -1,9 +1,20 @@
 import numpy as np
 import os
+import wave
+from collections import OrderedDict
 from scipy.io.wavfile import write
 from music_tools import NoteFrequencies
 # FIX: Import BaseInstrument from its new location
 from instruments.base_instrument import BaseInstrument
+from instruments import _kernels
+from composition_tools import compile_track
+
+# numexpr is optional: it fuses the track mixing into single threaded
+# passes. Without it we fall back to plain NumPy.
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
 
 # --- AUDIO MIXER CLASS ---
 
@@ -17,27 +28,36 @@ class AudioMixer:
         self.sample_rate = sample_rate
 
     # FIX: Change type hint from Instrument to BaseInstrument
-    def get_chord_waveform(self, instrument: BaseInstrument, frequencies: list, duration_s: float, amplitude=0.5):
+    def get_chord_waveform(self, instrument: BaseInstrument, frequencies: list, duration_s: float, amplitude=0.5, out=None, cache=True):
         """
         Generates a mixed waveform for a list of frequencies
         USING A SPECIFIC INSTRUMENT.
+        
+        If out is given, the waveform is written into it. cache=False
+        skips the instrument's waveform cache (see
+        BaseInstrument.get_waveform).
         """
-        if not frequencies:
-            return self.get_silence_waveform(duration_s)
+        if len(frequencies) == 0:
+            return self.get_silence_waveform(duration_s, out=out)
             
         wave = instrument.get_waveform(
             frequencies=frequencies,
             duration_s=duration_s,
             sample_rate=self.sample_rate,
-            amplitude=amplitude
+            amplitude=amplitude,
+            out=out,
+            cache=cache
         )
         
         return wave
 
-    def get_silence_waveform(self, duration_s: float):
-        """Generates a waveform of zeros (silence)."""
+    def get_silence_waveform(self, duration_s: float, out=None):
+        """Generates a waveform of zeros (silence), or zero-fills out."""
+        if out is not None:
+            out.fill(0)
+            return out
         num_samples = int(self.sample_rate * duration_s)
-        return np.zeros(num_samples)
+        return np.zeros(num_samples, dtype=np.float32)
 
 # --- SONG PLAYER CLASS ---
 
@@ -45,8 +65,14 @@ class SongPlayer:
     """
     Sequences notes and chords based on a tempo (BPM)
     to generate a full song waveform.
+    
+    Songs reuse a small palette of notes, so finished notes (faded out
+    and ready to place) are cached and copied into the song.
     """
     
+    note_cache_size = 256
+    release_s = 0.01 # Release fade: 10ms, or 5% of shorter notes
+    
     # --- MODIFIED __init__ ---
     def __init__(self, tempo, instrument: BaseInstrument, time_signature="4/4", sample_rate=44100, a4=440.0):
         """
@@ -57,19 +83,43 @@ class SongPlayer:
             instrument (BaseInstrument): The instrument to play.
             time_signature (str): e.g., "4/4", "3/4", "6/8".
         """
-        self.tempo = tempo
         self.instrument = instrument
         self.sample_rate = sample_rate
+        self.reconfigure(tempo, time_signature)
+
+        # Internal tools
+        self.freq_calc = NoteFrequencies(a4)
+        self.mixer = AudioMixer(sample_rate)
         
+        # Release fade ramps (NumPy path), cached per length. Every note of
+        # 0.2s or longer uses the full ramp, so build that one now.
+        self._fade_envs = {}
+        self._fade_env(int(self.sample_rate * self.release_s))
+        
+        # LRU cache: (instrument, sorted frequencies, num_samples, amplitude)
+        # -> read-only note
+        self._note_cache = OrderedDict()
+
+    def reconfigure(self, tempo=None, time_signature=None):
+        """
+        Changes the tempo and/or time signature (None keeps the current one),
+        e.g. to reuse one player for several sections of a song.
+        
+        Cached notes stay valid: they're keyed on sample counts, not beats.
+        """
+        if tempo is not None:
+            self.tempo = tempo
+            
         # Parse time signature
-        try:
-            parts = time_signature.split('/')
-            self.beats_per_measure = int(parts[0])
-            self.beat_unit = int(parts[1]) # e.g., 4 for quarter, 8 for eighth
-        except Exception:
-            print(f"Warning: Invalid time signature '{time_signature}'. Defaulting to 4/4.")
-            self.beats_per_measure = 4
-            self.beat_unit = 4
+        if time_signature is not None:
+            try:
+                parts = time_signature.split('/')
+                self.beats_per_measure = int(parts[0])
+                self.beat_unit = int(parts[1]) # e.g., 4 for quarter, 8 for eighth
+            except Exception:
+                print(f"Warning: Invalid time signature '{time_signature}'. Defaulting to 4/4.")
+                self.beats_per_measure = 4
+                self.beat_unit = 4
             
         # --- NEW DURATION LOGIC ---
         # Calculate the duration of a single "beat" (as defined by tempo and time_sig)
@@ -84,38 +134,76 @@ class SongPlayer:
         # e.g., 2/2: (2 / 4.0) = 0.5. A quarter note is 0.5x a half note beat.
         self.quarter_note_duration_s = self.base_beat_duration_s * (self.beat_unit / 4.0)
 
-        # Internal tools
-        self.freq_calc = NoteFrequencies(a4)
-        self.mixer = AudioMixer(sample_rate)
+    def _fade_env(self, num_samples):
+        """Returns the (cached) linear 1 -> 0 release ramp of the given length."""
+        env = self._fade_envs.get(num_samples)
+        if env is None:
+            env = self._fade_envs[num_samples] = np.linspace(1.0, 0.0, num_samples, dtype=np.float32)
+        return env
 
-    def get_note_waveform(self, note_list: list, duration_s: float, amplitude: float):
+    def get_note_waveform(self, note_list: list, duration_s: float, amplitude: float, out=None):
         """
         Generates the waveform for a single note or chord,
         applying a short fade-out to make it sound distinct.
+        
+        If out (int(sample_rate * duration_s) float32 samples) is given,
+        the note is rendered into it instead of a new buffer.
         """
-        # 1. Get frequencies from note names
-        frequencies = []
-        if note_list: # Check if it's not a rest
-            for note_name in note_list:
-                freq = self.freq_calc.get_frequency(note_name)
-                if freq:
-                    frequencies.append(freq)
+        if not note_list: # A rest
+            return self.mixer.get_silence_waveform(duration_s, out=out)
+            
+        # Get frequencies from note names (cached lookups)
+        frequencies = [self.freq_calc.get_frequency(note_name) for note_name in note_list]
+        frequencies = [freq for freq in frequencies if freq]
         
-        # 2. Get the base waveform from the mixer, using our instrument
+        return self._render_note(frequencies, duration_s, amplitude, out=out)
+
+    def _render_note(self, frequencies, duration_s: float, amplitude: float, out=None, cache=True):
+        """Renders one note or chord from resolved frequencies (into out, if given)."""
+        # 1. Get the base waveform from the mixer, using our instrument
         base_wave = self.mixer.get_chord_waveform(
-            self.instrument, frequencies, duration_s, amplitude
+            self.instrument, frequencies, duration_s, amplitude, out=out, cache=cache
         )
         
-        # 3. Apply a short fade-out (Release)
-        fade_duration_s = min(duration_s * 0.05, 0.01) # 10ms or 5%, whichever is shorter
+        # 2. Apply a short fade-out (Release)
+        fade_duration_s = min(duration_s * 0.05, self.release_s) # 10ms or 5%, whichever is shorter
         fade_out_samples = int(self.sample_rate * fade_duration_s)
 
         if fade_out_samples > 0 and len(base_wave) > fade_out_samples:
-            fade_envelope = np.linspace(1.0, 0.0, fade_out_samples)
-            base_wave[-fade_out_samples:] *= fade_envelope
+            if _kernels.HAVE_NUMBA:
+                _kernels.fade_out_kernel(base_wave, fade_out_samples)
+            else:
+                base_wave[-fade_out_samples:] *= self._fade_env(fade_out_samples)
             
         return base_wave
 
+    def _place_note(self, frequencies, duration_s: float, amplitude: float, out):
+        """
+        Writes one note or chord into out, rendering it only on a cache miss.
+        
+        Notes are keyed on what's actually heard: the same chord voiced in
+        another order, or a duration that differs only by float rounding
+        but lands on the same number of samples, is a hit. The instrument
+        is part of the key, so swapping self.instrument is safe.
+        """
+        # (Plain Python floats: they hash and compare much faster than NumPy scalars)
+        key = (self.instrument, tuple(sorted(np.asarray(frequencies).tolist())), len(out), amplitude)
+        note = self._note_cache.get(key)
+        if note is not None:
+            self._note_cache.move_to_end(key)
+            np.copyto(out, note)
+            return out
+            
+        # The finished note is cached here, so the instrument needn't keep
+        # its own copy of the waveform as well
+        self._render_note(frequencies, duration_s, amplitude, out=out, cache=False)
+        note = out.copy()
+        note.setflags(write=False)
+        self._note_cache[key] = note
+        if len(self._note_cache) > self.note_cache_size:
+            self._note_cache.popitem(last=False)
+        return out
+
     def generate_song_waveform(self, song_data: list, amplitude=0.5):
         """
         Generates the full song waveform from song data.
@@ -123,22 +211,46 @@ class SongPlayer:
         The 'num_beats' in song_data is *always* relative to a
         quarter note (1.0 = quarter note, 0.5 = 8th note, etc.)
         """
-        all_wave_chunks = []
+        return self.generate_compiled_waveform(compile_track(song_data, self.freq_calc), amplitude)
+
+    def generate_compiled_waveform(self, compiled_track, amplitude=0.5):
+        """
+        Generates the full song waveform from a track compiled with
+        composition_tools.compile_track().
+        
+        Every note's sample range is known up front, so notes are rendered
+        straight into their slice of one preallocated buffer.
+        """
+        durations, track_freqs = compiled_track
         
         print(f"Generating song with {self.instrument.__class__.__name__} ({self.beats_per_measure}/{self.beat_unit})...")
-        for note_list, num_beats in song_data:
-            
-            # --- MODIFIED DURATION CALCULATION ---
-            # Calculate duration based on our standard quarter note length
-            duration_s = self.quarter_note_duration_s * num_beats
-            
-            chunk = self.get_note_waveform(note_list, duration_s, amplitude)
-            all_wave_chunks.append(chunk)
+        
+        # Durations are based on our standard quarter note length
+        durations_s = self.quarter_note_duration_s * durations
+        num_samples = (self.sample_rate * durations_s).astype(int)
+        offsets = np.concatenate(([0], np.cumsum(num_samples)))
+        
+        final_waveform = np.empty(offsets[-1], dtype=np.float32)
+        # The per-note loop works on Python numbers, not NumPy scalars
+        events = zip(track_freqs, durations_s.tolist(), offsets[:-1].tolist(), offsets[1:].tolist())
+        for frequencies, duration_s, start, end in events:
+            self._place_note(frequencies, duration_s, amplitude, final_waveform[start:end])
             
-        final_waveform = np.concatenate(all_wave_chunks)
         print("Song generation complete.")
         return final_waveform
 
+    def generate_repeated(self, song_data: list, times: int, amplitude=0.5):
+        """
+        Generates the waveform of song_data played `times` times in a row,
+        e.g. a one-bar drum beat looped for a whole track.
+
+        Same result as generate_song_waveform(song_data * times), but the
+        pattern is only sequenced once and then tiled. (Each note's sample
+        count is rounded on its own, so the copies line up exactly.)
+        """
+        pattern_wave = self.generate_song_waveform(song_data, amplitude)
+        return np.tile(pattern_wave, max(times, 0))
+
 # --- MULTI-TRACK MIXER CLASS ---
 
 class MultiTrackMixer:
@@ -148,6 +260,9 @@ class MultiTrackMixer:
     and performs final normalization.
     """
     
+    # Samples mixed per tile (64 KiB of float32) without numexpr
+    tile_size = 16384
+    
     def __init__(self, master_amplitude=0.8):
         self.master_amplitude = np.clip(master_amplitude, 0.0, 1.0)
 
@@ -157,41 +272,133 @@ class MultiTrackMixer:
         """
         if not tracks_with_volumes:
             print("Warning: No tracks to mix.")
-            return np.array([])
+            return np.array([], dtype=np.float32)
             
         try:
             max_len = max(len(t[0]) for t in tracks_with_volumes)
         except (TypeError, IndexError):
             print("Error: 'tracks_with_volumes' must be a list of (waveform, volume) tuples.")
-            return np.array([])
+            return np.array([], dtype=np.float32)
 
-        master_track = np.zeros(max_len)
+        master_track = np.zeros(max_len, dtype=np.float32)
+        tracks = [
+            (np.asarray(track_wave, dtype=np.float32), np.float32(max(0.0, volume)))
+            for track_wave, volume in tracks_with_volumes
+            if track_wave is not None and len(track_wave) > 0
+        ]
         
-        for track_wave, volume in tracks_with_volumes:
-            if track_wave is None or len(track_wave) == 0:
-                continue
-            scaled_track = track_wave * max(0.0, volume)
-            master_track[:len(scaled_track)] += scaled_track
+        # master += track * volume
+        if ne is not None:
+            # numexpr already works through its operands in cache-sized blocks
+            for track_wave, volume in tracks:
+                head = master_track[:len(track_wave)]
+                ne.evaluate('m + w * v', local_dict={'m': head, 'w': track_wave, 'v': volume}, out=head)
+        else:
+            # Mix one tile at a time, all tracks into it, so the master tile
+            # stays in cache instead of streaming the whole mix once per track.
+            # Tracks are scaled into a small, reused scratch tile.
+            scratch = np.empty(self.tile_size, dtype=np.float32)
+            for start in range(0, max_len, self.tile_size):
+                tile = master_track[start:start + self.tile_size]
+                for track_wave, volume in tracks:
+                    segment = track_wave[start:start + self.tile_size]
+                    n = len(segment)
+                    if n == 0:
+                        continue
+                    np.multiply(segment, volume, out=scratch[:n])
+                    tile[:n] += scratch[:n]
             
-        max_val = np.max(np.abs(master_track))
+        # Peak level, without an np.abs temporary
+        max_val = max(master_track.max(), -master_track.min())
+        gain = self.master_amplitude
         if max_val > 1.0:
             print(f"Info: Mix exceeded 1.0 (max val: {max_val:.2f}), normalizing.")
-            master_track /= max_val
+            gain /= max_val
             
-        final_mix = np.clip(master_track * self.master_amplitude, -1.0, 1.0)
-        return final_mix
+        # Normalization and master volume are applied in one pass.
+        # The result peaks at master_amplitude <= 1.0, so no clip is needed.
+        master_track *= np.float32(gain)
+        return master_track
 
 # --- Utility Functions ---
 
-def normalize_to_16bit(waveform):
-    """Converts float waveform (-1.0 to 1.0) to 16-bit int."""
-    waveform_int = np.int16(waveform * 32767)
+def normalize_to_16bit(waveform, out=None, allow_inplace=False):
+    """
+    Converts float waveform (-1.0 to 1.0) to 16-bit int (into out, if given).
+    Values outside that range are clipped. Works for both 1D (mono) and
+    2D (stereo) arrays.
+    
+    With allow_inplace=True, the caller's waveform may be clipped in
+    place instead of into a temporary copy (NumPy path only).
+    """
+    waveform = np.asarray(waveform)
+    waveform_int = np.empty(waveform.shape, dtype=np.int16) if out is None else out
+    if _kernels.HAVE_NUMBA and waveform.flags.c_contiguous and waveform_int.flags.c_contiguous:
+        # Clip, scale and convert in one fused pass (flattened views, so
+        # mono and stereo are handled alike)
+        one = waveform.dtype.type(1)
+        _kernels.int16_kernel(waveform.reshape(-1), waveform_int.reshape(-1), one, one * 32767)
+    else:
+        # Handles any memory layout as-is, without a contiguous copy.
+        # (Values are truncated towards zero, as with np.int16())
+        waveform_clipped = np.clip(waveform, -1.0, 1.0, out=waveform if allow_inplace else None)
+        np.multiply(waveform_clipped, 32767, out=waveform_int, casting='unsafe')
     return waveform_int
 
-def save_wav(filename, sample_rate, waveform_int):
-    """Saves the 16-bit integer waveform to a .wav file."""
+def _output_path(filename):
+    """Relative file names are saved into the 'sounds/' directory."""
     if not os.path.isabs(filename):
         os.makedirs("sounds", exist_ok=True)
         filename = os.path.join("sounds", filename)
+    return filename
+
+def save_wav(filename, sample_rate, waveform_int):
+    """Saves the 16-bit integer waveform to a .wav file."""
+    filename = _output_path(filename)
     write(filename, sample_rate, waveform_int)
-    print(f"✅ Successfully saved '{filename}'")
\ No newline at end of file
+    print(f"✅ Successfully saved '{filename}'")
+
+class WaveStreamWriter:
+    """
+    Writes a 16-bit .wav file block by block, converting float audio
+    (-1.0 to 1.0) as it goes. Unlike normalize_to_16bit + save_wav, no
+    int16 copy of the whole song is ever held in memory.
+    
+        with WaveStreamWriter("song.wav", 44100) as wav_file:
+            wav_file.write(waveform) # Can be called repeatedly
+    """
+    
+    block_size = 44100 # Samples converted per block
+    
+    def __init__(self, filename, sample_rate, channels=1):
+        self.filename = _output_path(filename)
+        self._wav = wave.open(self.filename, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2) # 16-bit
+        self._wav.setframerate(sample_rate)
+        self._block = None # int16 conversion buffer, reused for every block
+
+    def write(self, waveform):
+        """Appends float samples (1D mono, or 2D (samples, channels))."""
+        waveform = np.asarray(waveform)
+        block_shape = (self.block_size,) + waveform.shape[1:]
+        if self._block is None or self._block.shape != block_shape:
+            self._block = np.empty(block_shape, dtype='<i2') # WAV data is little-endian
+            
+        for start in range(0, len(waveform), self.block_size):
+            chunk = waveform[start:start + self.block_size]
+            # The frame count in the header is fixed up on close()
+            self._wav.writeframesraw(normalize_to_16bit(chunk, out=self._block[:len(chunk)]))
+
+    def close(self):
+        self._wav.close()
+        print(f"✅ Successfully saved '{self.filename}'")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._wav.close() # Still release the file, but don't report success
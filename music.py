@@ -1,6 +1,6 @@
 # Import our custom tools
 from sound_design import InstrumentFactory
-from mixing import SongPlayer, MultiTrackMixer, save_wav, normalize_to_16bit
+from mixing import SongPlayer, MultiTrackMixer, WaveStreamWriter
 
 # --- Main Execution (Example Usage) ---
 
@@ -80,23 +80,25 @@ if __name__ == "__main__":
     print("\n--- Generating Melody (Piano) ---")
     player_piano = SongPlayer(tempo=TEMPO, instrument=piano_sound, sample_rate=SAMPLE_RATE)
     melody_wave = player_piano.generate_song_waveform(twinkle_twinkle_melody, amplitude=1.0)
-    save_wav("song_melody_piano.wav", SAMPLE_RATE, normalize_to_16bit(melody_wave))
+    with WaveStreamWriter("song_melody_piano.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(melody_wave)
 
 
     # 6. --- Generate Chords Track (Synth) ---
     print("\n--- Generating Chords (Sawtooth Synth) ---")
     player_synth = SongPlayer(tempo=TEMPO, instrument=synth_sound, sample_rate=SAMPLE_RATE)
     # Slower tempo for the chords
-    player_synth.tempo = 70 
-    player_synth.beat_duration_s = 60.0 / player_synth.tempo
+    player_synth.reconfigure(tempo=70)
     chord_wave = player_synth.generate_song_waveform(chord_progression, amplitude=1.0)
-    save_wav("song_chords_synth.wav", SAMPLE_RATE, normalize_to_16bit(chord_wave))
+    with WaveStreamWriter("song_chords_synth.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(chord_wave)
 
     # 7. --- Generate Drum Track ---
     print("\n--- Generating Drums ---")
     player_drums = SongPlayer(tempo=TEMPO, instrument=drum_kit, sample_rate=SAMPLE_RATE)
     drum_wave = player_drums.generate_song_waveform(drum_beat, amplitude=1.0)
-    save_wav("song_drums.wav", SAMPLE_RATE, normalize_to_16bit(drum_wave))
+    with WaveStreamWriter("song_drums.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(drum_wave)
     
 
     # 8. --- Mix all tracks together ---
@@ -112,7 +114,7 @@ if __name__ == "__main__":
     final_song_wave = track_mixer.mix_tracks(tracks_to_mix)
     
     # 9. Normalize and save the final song
-    final_song_int = normalize_to_16bit(final_song_wave)
-    save_wav("song_final_mix.wav", SAMPLE_RATE, final_song_int)
+    with WaveStreamWriter("song_final_mix.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(final_song_wave)
     
     print("\n--- All files generated. ---")
\ No newline at end of file
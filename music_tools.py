@@ -1,4 +1,10 @@
+import logging
 import re
+import numpy as np
+
+# Invalid notes and chords are reported as warnings. The messages are
+# formatted lazily, so they cost next to nothing when filtered out.
+logger = logging.getLogger(__name__)
 
 class NoteFrequencies:
     """
@@ -6,44 +12,82 @@ class NoteFrequencies:
     using the 12-tone equal temperament system.
     """
     
+    # These don't depend on the reference pitch, so they're built once
+    # and shared by every instance
+    twelfth_root_of_2 = 2**(1/12)
+    
+    note_map = {
+        'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 
+        'E': 4, 'F': 5, 'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 
+        'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
+    }
+    
+    semitones_a4 = note_map['A'] + 4 * 12 # 57
+    note_regex = re.compile(r'([A-G])([#b]?)(\d)')
+    
     def __init__(self, a4=440.0):
         self.a4 = a4
-        self.twelfth_root_of_2 = 2**(1/12)
         
-        self.note_map = {
-            'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 
-            'E': 4, 'F': 5, 'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 
-            'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-        }
+        # Frequency of every semitone, indexed by octave * 12 + semitone.
+        # Octaves 0-9 can be named; the extra octave leaves headroom for
+        # chords built on top of them.
+        self._freq_table = np.array([
+            self.a4 * (self.twelfth_root_of_2 ** (i - self.semitones_a4))
+            for i in range(11 * 12)
+        ])
         
-        self.semitones_a4 = self.note_map['A'] + 4 * 12 # 57
-        self.note_regex = re.compile(r'([A-G])([#b]?)(\d)')
+        # Note name -> frequency, filled in as notes are looked up.
+        # Songs reuse the same few notes, so each is only parsed once.
+        self._freq_cache = {}
 
     def get_frequency(self, note_name):
         """Returns the frequency of a given note (e.g., "A4", "C#5")."""
+        frequency = self._freq_cache.get(note_name)
+        if frequency is None:
+            frequency = self._parse_frequency(note_name)
+            # Invalid names aren't cached, so they keep reporting errors
+            if frequency is not None:
+                self._freq_cache[note_name] = frequency
+        return frequency
+
+    def get_frequency_fast(self, letter, accidental, octave):
+        """
+        Returns the frequency of an already split-up note name, e.g.
+        ('C', '#', 5) for "C#5", straight from the table (no parsing).
+        Like get_frequency, returns None for a note that can't be named
+        (unknown letter/accidental, or an octave outside 0-9).
+        """
+        semitone = self.note_map.get(letter + accidental)
+        if semitone is None or not 0 <= octave <= 9:
+            logger.warning("Invalid note '%s%s%s'.", letter, accidental, octave)
+            return None
+        return float(self._freq_table[octave * 12 + semitone])
+
+    def note_index(self, note_name):
+        """Returns the note's index into the frequency table, or None if invalid."""
         match = self.note_regex.match(note_name.strip())
         
         if not match:
-            print(f"Error: Invalid note format '{note_name}'.")
+            logger.warning("Invalid note format '%s'.", note_name)
             return None
             
         note_letter, accidental, octave_str = match.groups()
         
         try:
             note_base_name = note_letter + accidental
-            semitone_base = self.note_map[note_base_name]
-            octave = int(octave_str)
-            
-            target_semitone_num = semitone_base + octave * 12
-            n = target_semitone_num - self.semitones_a4
-            frequency = self.a4 * (self.twelfth_root_of_2 ** n)
-            
-            return frequency
+            return int(octave_str) * 12 + self.note_map[note_base_name]
             
         except KeyError:
-            print(f"Error: Invalid note name '{note_base_name}'.")
+            logger.warning("Invalid note name '%s'.", note_base_name)
             return None
 
+    def _parse_frequency(self, note_name):
+        """Parses a note name and looks up its frequency (uncached)."""
+        index = self.note_index(note_name)
+        if index is None:
+            return None
+        return float(self._freq_table[index])
+
 # --- NEW CHORD CLASS ---
 
 class Chord:
@@ -52,6 +96,21 @@ class Chord:
     of all notes in a chord based on a root note and quality.
     """
     
+    # Define chord "recipes" by their semitone intervals from the root
+    # (shared by every instance)
+    chord_intervals = {
+        # Triads
+        'major': [0, 4, 7],
+        'minor': [0, 3, 7],
+        'diminished': [0, 3, 6],
+        'augmented': [0, 4, 8],
+        
+        # Sevenths
+        'major7': [0, 4, 7, 11],
+        'minor7': [0, 3, 7, 10],
+        'dominant7': [0, 4, 7, 10],
+    }
+    
     def __init__(self, freq_calculator: NoteFrequencies):
         """
         Initializes the Chord builder.
@@ -60,48 +119,48 @@ class Chord:
             freq_calculator: An instantiated NoteFrequencies object.
         """
         self.freq_calc = freq_calculator
-        self.twelfth_root_of_2 = 2**(1/12)
         
-        # Define chord "recipes" by their semitone intervals from the root
-        self.chord_intervals = {
-            # Triads
-            'major': [0, 4, 7],
-            'minor': [0, 3, 7],
-            'diminished': [0, 3, 6],
-            'augmented': [0, 4, 8],
-            
-            # Sevenths
-            'major7': [0, 4, 7, 11],
-            'minor7': [0, 3, 7, 10],
-            'dominant7': [0, 4, 7, 10],
-        }
+        # (root_note, quality) -> read-only array of frequencies, filled
+        # in as chords are looked up (songs repeat the same few chords)
+        self._freq_cache = {}
 
     def get_frequencies(self, root_note: str, quality: str):
         """
-        Returns a list of frequencies for the specified chord.
+        Returns the frequencies of the specified chord, as an array
+        that can be broadcast against a time array directly. The array
+        is cached and shared between calls, so it is read-only.
         
         Args:
             root_note (str): The root note (e.g., "C4", "A3").
             quality (str): The chord quality (e.g., "major", "minor7").
             
         Returns:
-            list[float]: A list of frequencies, or an empty list on failure.
+            np.ndarray: The chord's frequencies (float64, read-only), or
+                an empty array on failure.
         """
-        # 1. Get the root frequency
-        root_freq = self.freq_calc.get_frequency(root_note)
-        if root_freq is None:
-            print(f"Error: Invalid root note '{root_note}'")
-            return []
+        chord_freqs = self._freq_cache.get((root_note, quality))
+        if chord_freqs is None:
+            chord_freqs = self._compute_frequencies(root_note, quality)
+            # Failures aren't cached, so they keep reporting errors
+            if len(chord_freqs):
+                chord_freqs.setflags(write=False)
+                self._freq_cache[root_note, quality] = chord_freqs
+        return chord_freqs
+
+    def _compute_frequencies(self, root_note: str, quality: str):
+        """Looks up the chord's frequencies (uncached)."""
+        # 1. Find the root in the frequency table
+        root_index = self.freq_calc.note_index(root_note)
+        if root_index is None:
+            logger.warning("Invalid root note '%s'", root_note)
+            return np.empty(0)
             
         # 2. Get the chord's interval "recipe"
         intervals = self.chord_intervals.get(quality)
         if intervals is None:
-            print(f"Error: Invalid chord quality '{quality}'.")
-            print(f"Supported qualities: {list(self.chord_intervals.keys())}")
-            return []
+            logger.warning("Invalid chord quality '%s'. Supported qualities: %s",
+                           quality, list(self.chord_intervals))
+            return np.empty(0)
             
-        # 3. Calculate each frequency based on the root
-        # f_note = f_root * (2^(1/12))^n
-        chord_freqs = [root_freq * (self.twelfth_root_of_2 ** n) for n in intervals]
-        
-        return chord_freqs
\ No newline at end of file
+        # 3. Look up each note, n semitones above the root
+        return self.freq_calc._freq_table[root_index + np.asarray(intervals)]
\ No newline at end of file
@@ -1,6 +1,6 @@
 # Import our custom tools
 from sound_design import InstrumentFactory
-from mixing import SongPlayer, MultiTrackMixer, save_wav, normalize_to_16bit
+from mixing import SongPlayer, MultiTrackMixer, WaveStreamWriter
 # Import the pre-filled aliases object
 from composition_tools import aliases as note
 
@@ -71,11 +71,9 @@ if __name__ == "__main__":
 
     # 6. --- Structure the Song ---
     
-    # Repeat the 4-bar riff 4 times (16 bars total)
-    bass_track_data = bass_riff_verse * 4
-    
-    # Repeat the 1-bar drum beat 16 times
-    drum_track_data = drum_beat * 16
+    # The bass repeats the 4-bar riff 4 times (16 bars total) and the
+    # drums repeat the 1-bar beat 16 times; each pattern is rendered once
+    # and looped (see SongPlayer.generate_repeated below).
     
     # Create the full melody track (8 bars of melody, 8 bars of rest)
     melody_track_data = verse_melody_a + verse_melody_b + [ (note.REST, 16.0) ]
@@ -86,11 +84,11 @@ if __name__ == "__main__":
     
     # Generate Bass Track
     player_bass = SongPlayer(TEMPO, bass_synth, time_signature="4/4", sample_rate=SAMPLE_RATE)
-    bass_wave = player_bass.generate_song_waveform(bass_track_data, amplitude=1.0)
+    bass_wave = player_bass.generate_repeated(bass_riff_verse, 4, amplitude=1.0)
     
     # Generate Drum Track
     player_drums = SongPlayer(TEMPO, drum_kit, time_signature="4/4", sample_rate=SAMPLE_RATE)
-    drum_wave = player_drums.generate_song_waveform(drum_track_data, amplitude=1.0)
+    drum_wave = player_drums.generate_repeated(drum_beat, 16, amplitude=1.0)
     
     # Generate Melody Track
     player_piano = SongPlayer(TEMPO, vocal_piano, time_signature="4/4", sample_rate=SAMPLE_RATE)
@@ -111,7 +109,8 @@ if __name__ == "__main__":
     final_song_wave = track_mixer.mix_tracks(tracks_to_mix)
     
     # 9. --- Save Final .wav File ---
-    final_song_int = normalize_to_16bit(final_song_wave)
-    save_wav("seven_nation_army_with_bass.wav", SAMPLE_RATE, final_song_int)
+    # (converted to 16-bit block by block while it's written)
+    with WaveStreamWriter("seven_nation_army_with_bass.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(final_song_wave)
     
     print("\n--- All files generated. ---")
\ No newline at end of file
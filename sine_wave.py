@@ -1,6 +1,10 @@
 import numpy as np
 from scipy.io.wavfile import write
 from scipy import signal # Used for sawtooth wave example
+from instruments import _kernels # Optional Numba kernels (NumPy fallback)
+from mixing import normalize_to_16bit
+
+_UNIT = np.ones(1)
 
 ## 1. Core Audio Generation Functions
 # ==================================
@@ -14,30 +18,25 @@ def generate_audio_file(filename, duration_s, sample_rate, wave_function, **wave
     """
     print(f"Generating '{filename}'...")
     
-    # 1. Generate Time Array
+    # 1. Generate Time Array (sample i plays at i / sample_rate), built
+    # and scaled in place: one array, no linspace temporaries
     num_samples = int(sample_rate * duration_s)
-    t = np.linspace(0., duration_s, num_samples, endpoint=False)
+    t = np.arange(num_samples, dtype=float)
+    t /= sample_rate
     
     # 2. Generate the Waveform
-    # This will be 1D for mono or 2D for stereo, based on the function
+    # This will be 1D for mono or 2D for stereo, based on the function.
+    # The built-in functions return float32, plenty for 16-bit output;
+    # t stays float64, since phases are computed from it.
     waveform_float = wave_function(t, **wave_params)
     
     # 3. Normalize and Convert to 16-bit
-    waveform_int = normalize_to_16bit(waveform_float)
+    # (The float waveform isn't needed afterwards, so it may be clipped in place)
+    waveform_int = normalize_to_16bit(waveform_float, allow_inplace=True)
     
     # 4. Write to File
     save_wav(filename, sample_rate, waveform_int)
 
-def normalize_to_16bit(waveform):
-    """
-    Normalizes a float waveform (-1.0 to 1.0) to 16-bit integer 
-    (-32768 to 32767) for .wav file storage.
-    Works for both 1D (mono) and 2D (stereo) arrays.
-    """
-    waveform_clipped = np.clip(waveform, -1.0, 1.0)
-    waveform_int = np.int16(waveform_clipped * 32767)
-    return waveform_int
-
 def save_wav(filename, sample_rate, waveform_int):
     """
     Saves the 16-bit integer waveform to a .wav file.
@@ -50,19 +49,37 @@ def save_wav(filename, sample_rate, waveform_int):
 ## 2. User-Definable Wave Functions (f(t) -> y)
 # ===========================================
 
+def _sines(t, frequencies, amplitude, out=None):
+    """
+    Sum of amplitude * sin(2*pi*f*t) over frequencies, added into out
+    (a new float32 array by default). With Numba this is one fused,
+    parallel pass with no temporaries.
+    """
+    if out is None:
+        out = np.zeros(len(t), dtype=np.float32)
+    if _kernels.HAVE_NUMBA:
+        _kernels.piano_kernel(t, np.asarray(frequencies, dtype=float), _UNIT, np.array([amplitude]), out)
+    else:
+        # One reused (float64) phase buffer, then accumulated into out
+        phase = np.empty(len(t))
+        for freq in frequencies:
+            np.multiply(t, 2 * np.pi * freq, out=phase)
+            np.sin(phase, out=phase)
+            phase *= amplitude
+            out += phase
+    return out
+
 def sine_wave(t, frequency, amplitude=0.5):
     """A simple mono sine wave."""
-    return amplitude * np.sin(2 * np.pi * frequency * t)
+    return _sines(t, [frequency], amplitude)
 
 def simple_chord(t, freq1, freq2, amplitude=0.5):
     """A complex mono wave: two sine waves added together."""
-    wave1 = (amplitude / 2) * np.sin(2 * np.pi * freq1 * t)
-    wave2 = (amplitude / 2) * np.sin(2 * np.pi * freq2 * t)
-    return wave1 + wave2
+    return _sines(t, [freq1, freq2], amplitude / 2)
 
 def sawtooth_wave(t, frequency, amplitude=0.5):
     """A non-sinusoidal mono wave (sawtooth)."""
-    return amplitude * signal.sawtooth(2 * np.pi * frequency * t)
+    return np.multiply(signal.sawtooth(2 * np.pi * frequency * t), amplitude, dtype=np.float32)
 
 # --- NEW BINAURAL FUNCTION ---
 def binaural_beat(t, base_frequency, beat_frequency, amplitude=0.5):
@@ -78,12 +95,12 @@ def binaural_beat(t, base_frequency, beat_frequency, amplitude=0.5):
     freq_left = base_frequency
     freq_right = base_frequency + beat_frequency
     
-    # 2. Generate separate waves for each channel
-    wave_left = amplitude * np.sin(2 * np.pi * freq_left * t)
-    wave_right = amplitude * np.sin(2 * np.pi * freq_right * t)
-    
-    # 3. Stack them into a 2-column (stereo) array
-    waveform_stereo = np.stack([wave_left, wave_right], axis=1)
+    # 2. Generate each channel straight into its column
+    # of a 2-column (stereo) array. float32 is plenty for
+    # audio that ends up as 16-bit, and halves the memory traffic.
+    waveform_stereo = np.zeros((len(t), 2), dtype=np.float32)
+    _sines(t, [freq_left], amplitude, out=waveform_stereo[:, 0])
+    _sines(t, [freq_right], amplitude, out=waveform_stereo[:, 1])
     
     return waveform_stereo
 
@@ -1,10 +1,33 @@
+import logging
 import re
+import numpy as np
 
 # --- Project Imports ---
 from sound_design import InstrumentFactory
-from mixing import SongPlayer, MultiTrackMixer, save_wav, normalize_to_16bit
+from music_tools import NoteFrequencies
+from mixing import SongPlayer, MultiTrackMixer, WaveStreamWriter
 from composition_tools import aliases # Import the pre-filled aliases object
 
+logger = logging.getLogger(__name__)
+
+# One pattern covers every kind of line in a .song file (at most one of
+# the named groups is set; blank and comment lines set none), so the
+# whole file is parsed in a single finditer pass.
+_LINE_RE = re.compile(r"""
+    ^[^\S\n]*
+    (?:
+        \#.*                                 # comment
+      | \[TRACK:(?P<track>.*?)\S             # [TRACK: name]
+      | \[REPEAT:(?P<repeat>.*?)\S           # [REPEAT: n]
+      | (?P<key>[^:\n]*):(?P<val>.*?)         # KEY: value (a setting)
+      | (?P<notes>\S.*?)                      # notes [duration]
+    )?
+    [^\S\n]*$
+""", re.MULTILINE | re.VERBOSE)
+
+# A note line's last word is its duration if it looks like a number
+_DURATION_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
 class SongParser:
     """
     Parses a .song text file and uses the synthesizer framework
@@ -30,6 +53,11 @@ class SongParser:
         self.factory = InstrumentFactory()
         self.aliases = aliases # Use the pre-filled aliases
         
+        # Note data is resolved to frequencies as it's parsed, each
+        # alias only once: alias -> tuple of frequencies
+        self.freq_calc = NoteFrequencies()
+        self._alias_freqs = {}
+        
         # Parsed data
         self.global_settings = {
             'TEMPO': 120,
@@ -37,7 +65,7 @@ class SongParser:
             'MASTER_AMPLITUDE': 0.7,
             'OUTPUT_FILE': 'output.wav'
         }
-        self.tracks = [] # List of track dictionaries
+        self.tracks = [] # List of track dictionaries ('data' holds (frequencies, num_beats) tuples)
 
     def build_song(self):
         """
@@ -53,103 +81,112 @@ class SongParser:
             print("--- Build complete ---")
             
         except Exception as e:
-            print(f"An error occurred during song building: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("An error occurred during song building: %s", e)
 
     def _parse_file(self):
         """
-        Internal method. Reads and parses the .song file line by line.
+        Internal method. Reads and parses the .song file, one line
+        (one _LINE_RE match) at a time.
         """
         current_track = None
+        repeat_start = 0 # Where the block a [REPEAT] repeats begins
         
         with open(self.input_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                
-                # Skip comments and empty lines
-                if not line or line.startswith('#'):
-                    continue
-                
-                # --- Parse [TRACK: name] ---
-                if line.startswith('[TRACK:'):
-                    track_name = line[7:-1].strip()
-                    current_track = {
-                        'name': track_name,
-                        'settings': {},
-                        'data': []
-                    }
-                    self.tracks.append(current_track)
+            text = f.read()
+            
+        for match in _LINE_RE.finditer(text):
+            track_name, repeat, key, val, notes = match.group('track', 'repeat', 'key', 'val', 'notes')
+            
+            # --- Parse [TRACK: name] ---
+            if track_name is not None:
+                current_track = {
+                    'name': track_name.strip(),
+                    'settings': {},
+                    'data': []
+                }
+                self.tracks.append(current_track)
+                repeat_start = 0
+            
+            # --- Parse [REPEAT: n] ---
+            elif repeat is not None:
+                if current_track is None:
+                    logger.warning("[REPEAT] command found outside of a track. Ignoring.")
                     continue
+                try:
+                    repeat_count = int(repeat.strip())
+                    # Repeat the note data since the last [TRACK] or
+                    # [REPEAT] (one C-level list repeat, not a loop).
+                    # Earlier blocks aren't repeated again, so several
+                    # REPEATs in a track don't compound.
+                    data = current_track['data']
+                    data.extend(data[repeat_start:] * max(repeat_count, 0))
+                    repeat_start = len(data)
+                except ValueError:
+                    logger.warning("Invalid REPEAT value in line: %s. Ignoring.", match.group().strip())
+
+            # --- Parse Settings (TEMPO: 120, INSTRUMENT: piano) ---
+            elif key is not None:
+                key = key.strip().upper()
+                val = val.strip()
                 
-                # --- Parse [REPEAT: n] ---
-                if line.startswith('[REPEAT:'):
-                    if current_track is None:
-                        print("Warning: [REPEAT] command found outside of a track. Ignoring.")
-                        continue
-                    try:
-                        repeat_count = int(line[8:-1].strip())
-                        # Get all note data *above* the repeat command
-                        # This finds the last [TRACK] or [REPEAT] entry and repeats from there.
-                        # For simplicity, we'll just repeat the current data block.
-                        original_data = list(current_track['data'])
-                        for _ in range(repeat_count):
-                            current_track['data'].extend(original_data)
-                    except ValueError:
-                        print(f"Warning: Invalid REPEAT value in line: {line}. Ignoring.")
-                    continue
+                if current_track:
+                    # This is a track setting
+                    current_track['settings'][key] = val
+                else:
+                    # This is a global setting
+                    self.global_settings[key] = val
 
-                # --- Parse Settings (TEMPO: 120, INSTRUMENT: piano) ---
-                if ':' in line:
-                    key, val = line.split(':', 1)
-                    key = key.strip().upper()
-                    val = val.strip()
-                    
-                    if current_track:
-                        # This is a track setting
-                        current_track['settings'][key] = val
-                    else:
-                        # This is a global setting
-                        self.global_settings[key] = val
-                    continue
+            # --- Parse Note Data (C4, or C4 1.0, or KICK HAT 0.5) ---
+            elif notes is not None and current_track:
+                self._parse_notes(notes, current_track)
+                
+            # (Anything else is a blank line or a comment)
 
-                # --- Parse Note Data (C4, or C4 1.0, or KICK HAT 0.5) ---
-                if current_track:
-                    parts = line.split()
-                    if not parts:
-                        continue
-                        
-                    try:
-                        # --- UPDATED LOGIC ---
-                        try:
-                            # Try to parse the last part as a float
-                            duration = float(parts[-1])
-                            note_parts = parts[:-1] # All other parts are notes
-                        except ValueError:
-                            # Failed: Last part is not a float.
-                            # Assume default duration of 1.0 and all parts are notes.
-                            duration = 1.0
-                            note_parts = parts
-                        # --- END UPDATED LOGIC ---
+    def _parse_notes(self, line, current_track):
+        """Parses one line of note data and appends it to the track."""
+        parts = line.split()
+        try:
+            # --- UPDATED LOGIC ---
+            if _DURATION_RE.fullmatch(parts[-1]):
+                # The last part is a number
+                duration = float(parts[-1])
+                note_parts = parts[:-1] # All other parts are notes
+            else:
+                # Last part is not a number.
+                # Assume default duration of 1.0 and all parts are notes.
+                duration = 1.0
+                note_parts = parts
+            # --- END UPDATED LOGIC ---
 
-                        if not note_parts:
-                            print(f"Warning: Line has duration but no notes: '{line}'. Ignoring.")
-                            continue
+            if not note_parts:
+                logger.warning("Line has duration but no notes: '%s'. Ignoring.", line)
+                return
 
-                        note_list = []
-                        for note_alias in note_parts:
-                            notes = self.aliases.get(note_alias)
-                            if notes is not None:
-                                note_list.extend(notes)
-                            else:
-                                print(f"Warning: Unknown alias '{note_alias}' in track '{current_track['name']}'. Ignoring.")
-                        
-                        current_track['data'].append((note_list, duration))
-                        
-                    except Exception as e:
-                        # General catch-all for any other parsing error on the line
-                        print(f"Warning: Invalid note data format in line: '{line}'. Ignoring. Error: {e}")
+            frequencies = ()
+            for note_alias in note_parts:
+                alias_freqs = self._resolve_alias(note_alias)
+                if alias_freqs is not None:
+                    frequencies += alias_freqs
+                else:
+                    logger.warning("Unknown alias '%s' in track '%s'. Ignoring.", note_alias, current_track['name'])
+            
+            current_track['data'].append((frequencies, duration))
+            
+        except Exception as e:
+            # General catch-all for any other parsing error on the line
+            logger.warning("Invalid note data format in line: '%s'. Ignoring. Error: %s", line, e)
                 
+    def _resolve_alias(self, note_alias):
+        """Returns the (cached) frequencies of an alias, or None if it's unknown."""
+        alias_freqs = self._alias_freqs.get(note_alias)
+        if alias_freqs is None:
+            notes = self.aliases.get(note_alias)
+            if notes is None:
+                return None
+            freqs = (self.freq_calc.get_frequency(note_name) for note_name in notes)
+            alias_freqs = self._alias_freqs[note_alias] = tuple(f for f in freqs if f)
+        return alias_freqs
+
     def _build_tracks(self):
         """
         Internal method. Uses the parsed data to generate
@@ -162,7 +199,7 @@ class SongParser:
             master_amplitude = float(self.global_settings['MASTER_AMPLITUDE'])
             output_file = self.global_settings['OUTPUT_FILE']
         except (ValueError, KeyError) as e:
-            print(f"Error: Missing or invalid global setting: {e}")
+            logger.error("Missing or invalid global setting: %s", e)
             return
 
         generated_tracks = [] # To hold (waveform, volume) tuples
@@ -191,12 +228,18 @@ class SongParser:
                     sample_rate=sample_rate
                 )
                 
-                # Generate wave
-                wave = player.generate_song_waveform(data, amplitude=1.0) # Full amplitude, will be scaled by mixer
+                # Generate wave. The notes were resolved while parsing,
+                # so the data only needs packing into a compiled track
+                # (see composition_tools.compile_track).
+                compiled_track = (
+                    np.asarray([num_beats for _, num_beats in data], dtype=float),
+                    [np.asarray(frequencies, dtype=float) for frequencies, _ in data]
+                )
+                wave = player.generate_compiled_waveform(compiled_track, amplitude=1.0) # Full amplitude, will be scaled by mixer
                 generated_tracks.append((wave, volume))
                 
             except Exception as e:
-                print(f"Error building track '{track.get('name', 'UNKNOWN')}': {e}")
+                logger.error("Error building track '%s': %s", track.get('name', 'UNKNOWN'), e)
                 
         # --- Mix all generated tracks ---
         if not generated_tracks:
@@ -208,5 +251,6 @@ class SongParser:
         final_wave = mixer.mix_tracks(generated_tracks)
         
         # --- Save the final file ---
-        final_wave_16bit = normalize_to_16bit(final_wave)
-        save_wav(output_file, sample_rate, final_wave_16bit)
\ No newline at end of file
+        # (converted to 16-bit block by block while it's written)
+        with WaveStreamWriter(output_file, sample_rate) as wav_file:
+            wav_file.write(final_wave)
\ No newline at end of file
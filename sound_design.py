@@ -1,8 +1,61 @@
 import os
+import glob
+import functools
 import importlib
-import inspect
 from instruments.base_instrument import BaseInstrument
 
+@functools.lru_cache(maxsize=4)
+def _discover(plugin_dir):
+    """
+    Dynamically imports all instrument plugins from the plugin directory.
+    
+    Scanning only happens once per directory per process; later
+    factories reuse the result.
+    
+    Returns:
+        dict: Plugin name -> instrument class.
+    """
+    plugins = {}
+    print(f"Loading instrument plugins from '{plugin_dir}'...")
+    if not os.path.isdir(plugin_dir):
+        print(f"Warning: Plugin directory '{plugin_dir}' not found.")
+        return plugins
+
+    # Underscore-prefixed modules (__init__, _kernels, ...) aren't plugins
+    for path in glob.iglob(os.path.join(plugin_dir, "[!_]*.py")):
+        module_name = os.path.basename(path)[:-3]
+        module_path = f"{plugin_dir}.{module_name}"
+        
+        try:
+            # Import the module (e.g., "instruments.basic_synths")
+            module = importlib.import_module(module_path)
+            
+            # Walk the module's own namespace (sorted by name, as
+            # inspect.getmembers did)
+            for name, obj in sorted(vars(module).items()):
+                # Check if it's a valid plugin:
+                # 1. Is it a class defined in this module (not imported)?
+                #    (Checked first: most module attributes are imports.)
+                # 2. Is it a subclass of BaseInstrument?
+                # 3. Is it NOT BaseInstrument itself?
+                if (isinstance(obj, type) and
+                    obj.__module__ == module_path and
+                    issubclass(obj, BaseInstrument) and 
+                    obj is not BaseInstrument):
+                    
+                    plugin_name = name.lower()
+                    if plugin_name in plugins:
+                        print(f"Warning: Duplicate plugin name '{plugin_name}'.")
+                    else:
+                        plugins[plugin_name] = obj
+                        print(f"  > Loaded: '{plugin_name}'")
+                        
+        except ImportError as e:
+            print(f"Error loading plugin {module_path}: {e}")
+    
+    print(f"Total plugins loaded: {len(plugins)}")
+    return plugins
+
 class InstrumentFactory:
     """
     Loads, caches, and creates instrument plugin instances.
@@ -14,45 +67,11 @@ class InstrumentFactory:
 
     def _load_plugins(self, plugin_dir="instruments"):
         """
-        Dynamically imports all instrument plugins from the plugin directory.
+        Loads the instrument plugins from the plugin directory
+        (scanned once per process, see _discover).
         """
-        print(f"Loading instrument plugins from '{plugin_dir}'...")
-        if not os.path.isdir(plugin_dir):
-            print(f"Warning: Plugin directory '{plugin_dir}' not found.")
-            return
-
-        for filename in os.listdir(plugin_dir):
-            if not filename.endswith(".py") or filename.startswith("__"):
-                continue
-                
-            module_name = filename[:-3]
-            module_path = f"{plugin_dir}.{module_name}"
-            
-            try:
-                # Import the module (e.g., "instruments.basic_synths")
-                module = importlib.import_module(module_path)
-                
-                # Find all classes in the module
-                for name, obj in inspect.getmembers(module, inspect.isclass):
-                    # Check if it's a valid plugin:
-                    # 1. Is it a subclass of BaseInstrument?
-                    # 2. Is it NOT BaseInstrument itself?
-                    # 3. Is it defined in this module (not imported)?
-                    if (issubclass(obj, BaseInstrument) and 
-                        obj is not BaseInstrument and
-                        obj.__module__ == module_path):
-                        
-                        plugin_name = name.lower()
-                        if plugin_name in self.loaded_plugins:
-                            print(f"Warning: Duplicate plugin name '{plugin_name}'.")
-                        else:
-                            self.loaded_plugins[plugin_name] = obj
-                            print(f"  > Loaded: '{plugin_name}'")
-                            
-            except ImportError as e:
-                print(f"Error loading plugin {module_path}: {e}")
-        
-        print(f"Total plugins loaded: {len(self.loaded_plugins)}")
+        # A copy, so changes to this factory don't leak into the cache
+        self.loaded_plugins = dict(_discover(plugin_dir))
 
     def create_instrument(self, name: str, **adsr_params):
         """
@@ -1,4 +1,3 @@
-import numpy as np
 import os
 from scipy.io.wavfile import write
 
@@ -7,21 +6,16 @@ from scipy.io.wavfile import write
 # aliases for notes, and SongPlayer to generate audio.
 from sound_design import InstrumentFactory
 from composition_tools import aliases
-from mixing import SongPlayer
+from mixing import SongPlayer, normalize_to_16bit
 
 # --- Config ---
 SAMPLE_RATE = 44100
 TEMPO = 120 # 120 BPM for all test clips
 
 # --- Utility Functions (Copied from mixing.py) ---
-# We copy these to change the save directory to 'samples/'
+# We copy this to change the save directory to 'samples/'
 # without modifying the main 'mixing.py' file.
 
-def normalize_to_16bit(waveform):
-    """Converts float waveform (-1.0 to 1.0) to 16-bit int."""
-    waveform_int = np.int16(waveform * 32767)
-    return waveform_int
-
 def save_wav_sample(filename, sample_rate, waveform_int):
     """Saves the 16-bit integer waveform to a .wav file in the 'samples/' directory."""
     output_dir = "samples" # Changed from 'sounds'
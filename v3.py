@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+
 # Import our custom tools
 from sound_design import InstrumentFactory
-from mixing import SongPlayer, MultiTrackMixer, save_wav, normalize_to_16bit
+from mixing import SongPlayer, MultiTrackMixer, WaveStreamWriter
 
 # --- Main Execution (Example Usage) ---
 
@@ -35,39 +37,22 @@ if __name__ == "__main__":
     
     # --- 4. EXAMPLE 1: 4/4 Time ---
     
-    # A simple drum beat (4/4)
+    # A simple drum beat (4/4), played 8 times
     # num_beats = 0.5 means an 8th note
     drum_beat_4_4 = [
         (KICK, 0.5), (HAT, 0.5), (SNARE, 0.5), (HAT, 0.5),
         (KICK, 0.5), (HAT, 0.5), (SNARE, 0.5), (HAT, 0.5),
-    ] * 8
+    ]
     
-    # A simple chord progression (4/4)
+    # A simple chord progression (4/4), played twice
     # num_beats = 4.0 means a whole note
     chord_progression_4_4 = [
         (C_MAJOR, 4), (G_MAJOR, 4),
-    ] * 2
-
-    # --- Generate 4/4 Tracks ---
-    print("\n--- Generating 4/4 Tracks ---")
-    player_drums = SongPlayer(tempo=120, instrument=drum_kit, time_signature="4/4", sample_rate=SAMPLE_RATE)
-    drum_wave = player_drums.generate_song_waveform(drum_beat_4_4, amplitude=1.0)
-    
-    player_synth = SongPlayer(tempo=120, instrument=synth_sound, time_signature="4/4", sample_rate=SAMPLE_RATE)
-    chord_wave = player_synth.generate_song_waveform(chord_progression_4_4, amplitude=1.0)
-    
-    # --- Mix 4/4 Tracks ---
-    track_mixer = MultiTrackMixer(master_amplitude=0.7)
-    final_4_4_mix = track_mixer.mix_tracks([
-        (drum_wave, 0.8),
-        (chord_wave, 0.4)
-    ])
-    save_wav("song_4_4_mix.wav", SAMPLE_RATE, normalize_to_16bit(final_4_4_mix))
-    print("-" * 30)
+    ]
 
     # --- 5. EXAMPLE 2: 6/8 Time ---
     
-    # A simple jig melody (6/8)
+    # A simple jig melody (6/8), played 4 times
     # num_beats = 0.5 means an 8th note
     # num_beats = 1.5 means a dotted quarter note
     jig_melody_6_8 = [
@@ -75,36 +60,60 @@ if __name__ == "__main__":
         (G4, 0.5), (A4, 0.5), (B4, 0.5), (G4, 1.5),              # Bar 2
         (D4, 0.5), (E4, 0.5), (F4, 0.5), (D4, 0.5), (E4, 0.5), (F4, 0.5), # Bar 3
         (E4, 1.5), (D4, 1.5),                                    # Bar 4
-    ] * 4
+    ]
     
-    # A simple drum beat (6/8)
+    # A simple drum beat (6/8), played 16 times
     # KICK on 1, SNARE on 4
     drum_beat_6_8 = [
         (KICK, 0.5), (HAT, 0.5), (HAT, 0.5),
         (SNARE, 0.5), (HAT, 0.5), (HAT, 0.5),
-    ] * 16
+    ]
 
-    # --- Generate 6/8 Tracks ---
-    print("\n--- Generating 6/8 Tracks ---")
+    # --- 6. Generate All Tracks ---
+    print("\n--- Generating Tracks ---")
+    player_drums = SongPlayer(tempo=120, instrument=drum_kit, time_signature="4/4", sample_rate=SAMPLE_RATE)
+    player_synth = SongPlayer(tempo=120, instrument=synth_sound, time_signature="4/4", sample_rate=SAMPLE_RATE)
     # Note: 180 BPM in 6/8 time (180 8th-notes per minute)
     player_piano = SongPlayer(tempo=180, instrument=piano_sound, time_signature="6/8", sample_rate=SAMPLE_RATE)
-    jig_wave = player_piano.generate_song_waveform(jig_melody_6_8, amplitude=1.0)
+    # The 6/8 drums get their own player rather than re-timing player_drums,
+    # so the two drum tracks can be rendered at the same time
+    player_drums_6_8 = SongPlayer(tempo=180, instrument=drum_kit, time_signature="6/8", sample_rate=SAMPLE_RATE)
     
-    player_drums.tempo = 180
-    player_drums.time_signature = "6/8"
-    player_drums.beat_unit = 8
-    player_drums.base_beat_duration_s = 60.0 / 180
-    player_drums.quarter_note_duration_s = player_drums.base_beat_duration_s * (8.0 / 4.0)
+    # The four tracks are independent, so render them concurrently. The
+    # Numba kernels still run one at a time (instruments/_kernels.py
+    # launches them under one lock, and each already uses every core);
+    # what overlaps is the NumPy and Python work around them. Each
+    # pattern is rendered once and looped (see SongPlayer.generate_repeated).
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        drum_future = executor.submit(player_drums.generate_repeated, drum_beat_4_4, 8, amplitude=1.0)
+        chord_future = executor.submit(player_synth.generate_repeated, chord_progression_4_4, 2, amplitude=1.0)
+        jig_future = executor.submit(player_piano.generate_repeated, jig_melody_6_8, 4, amplitude=1.0)
+        drum_6_8_future = executor.submit(player_drums_6_8.generate_repeated, drum_beat_6_8, 16, amplitude=1.0)
+        drum_wave = drum_future.result()
+        chord_wave = chord_future.result()
+        jig_wave = jig_future.result()
+        drum_wave_6_8 = drum_6_8_future.result()
+    print("-" * 30)
     
-    drum_wave_6_8 = player_drums.generate_song_waveform(drum_beat_6_8, amplitude=1.0)
+    # --- Mix 4/4 Tracks ---
+    # (Both songs use the same master level, so they share one mixer)
+    track_mixer = MultiTrackMixer(master_amplitude=0.7)
+    final_4_4_mix = track_mixer.mix_tracks([
+        (drum_wave, 0.8),
+        (chord_wave, 0.4)
+    ])
+    # The float32 mix is converted to 16-bit block by block as it's written
+    with WaveStreamWriter("song_4_4_mix.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(final_4_4_mix)
+    print("-" * 30)
 
     # --- Mix 6/8 Tracks ---
-    track_mixer_6_8 = MultiTrackMixer(master_amplitude=0.7)
-    final_6_8_mix = track_mixer_6_8.mix_tracks([
+    final_6_8_mix = track_mixer.mix_tracks([
         (jig_wave, 0.7),
         (drum_wave_6_8, 0.5)
     ])
-    save_wav("song_6_8_jig.wav", SAMPLE_RATE, normalize_to_16bit(final_6_8_mix))
+    with WaveStreamWriter("song_6_8_jig.wav", SAMPLE_RATE) as wav_file:
+        wav_file.write(final_6_8_mix)
     print("-" * 30)
 
     print("\n--- All files generated. ---")
\ No newline at end of file